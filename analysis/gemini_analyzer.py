@@ -1,7 +1,84 @@
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 import json
+import os
+import random
+import re
+import threading
 import time
+from collections import OrderedDict
 from io import BytesIO
+from PIL import Image
+
+from capture.app_detect import detect_app
+from core.jsonio import loads
+
+# Remembers the first model that initialized successfully so later
+# startups can skip probing the whole candidate list
+_MODEL_CACHE_PATH = "memory/gemini_model.json"
+
+# Near-duplicate frame cache: consecutive screenshots of an idle desktop
+# hash to (almost) the same dHash, so the previous analysis is reused.
+# Entries are per window title and expire quickly: dHash alone cannot tell
+# two files in the same editor apart
+_FRAME_CACHE_SIZE = 64
+_FRAME_MAX_DISTANCE = 5  # max differing hash bits to count as the same screen
+_FRAME_CACHE_TTL = 30.0  # seconds an analysis may be reused
+
+# Gemini downsamples large images itself, so anything bigger is wasted upload
+_UPLOAD_MAX_SIZE = (1280, 1280)
+
+# MVP prompt - compact schema hint, built once (fewer input tokens per call)
+_PROMPT = (
+    'Analyze this developer screen. Return ONLY a JSON object: '
+    '{"app_detected":str,'
+    '"primary_activity":"coding|debugging|reading|browsing|designing|writing",'
+    '"visible_text_summary":str(max 100 chars),'
+    '"potential_errors":[str],'
+    '"confidence_score":float,'
+    '"suggested_context":"web_dev|data_analysis|writing|unknown"}'
+)
+
+# Intent -> (keywords in primary_activity, keywords in visible_text_summary),
+# in precedence order
+_INTENT_RULES = {
+    "debugging": (("error", "debug"), ("error",)),
+    "coding": (("code", "program"), ("script",)),
+    "reading": (("read",), ("article", "paper")),
+    "designing": (("design",), ("ui", "ux")),
+    "writing": (("write",), ("document",))
+}
+_ACTIVITY_KEYWORDS = {kw: intent for intent, (kws, _) in _INTENT_RULES.items() for kw in kws}
+_SUMMARY_KEYWORDS = {kw: intent for intent, (_, kws) in _INTENT_RULES.items() for kw in kws}
+# Lookahead so overlapping keywords are all reported in one pass
+_ACTIVITY_RE = re.compile("(?=(" + "|".join(map(re.escape, _ACTIVITY_KEYWORDS)) + "))")
+_SUMMARY_RE = re.compile("(?=(" + "|".join(map(re.escape, _SUMMARY_KEYWORDS)) + "))")
+
+# Default Gemini requests-per-minute budget (free tier flash models)
+_DEFAULT_GEMINI_RPM = 15
+_MAX_API_ATTEMPTS = 4
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens/second, bursts up to `capacity`"""
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Take one token if available; never blocks"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
 
 class MVP_GeminiAnalyzer:
     """
@@ -12,6 +89,12 @@ class MVP_GeminiAnalyzer:
         self.config = config
         self.tracker = tracker
         self.api_calls = 0
+        self._frame_cache = OrderedDict()  # (dhash, window title) -> (monotonic time, analysis)
+        self._local = threading.local()  # per-thread reusable encode buffer
+        
+        # Throttle API calls so a fast capture loop doesn't trip 429s
+        rpm = getattr(config, "gemini_rpm", _DEFAULT_GEMINI_RPM)
+        self._bucket = TokenBucket(rate=rpm / 60, capacity=rpm)
         
         # Configure Gemini
         genai.configure(api_key=config.gemini_api_key)
@@ -20,23 +103,37 @@ class MVP_GeminiAnalyzer:
         self.model = None
         self.model_name = None
         
+        # Reuse the model that worked last time, if any
+        cached_name = self._load_cached_model_name()
+        if cached_name:
+            try:
+                self.model = genai.GenerativeModel(cached_name)
+                self.model_name = cached_name
+                print(f"✓ Using cached model: {cached_name}")
+            except Exception as e:
+                print(f"✗ Cached model {cached_name} failed: {str(e)[:100]}")
+                self.invalidate_model_cache()
+        
         # Try different model names (with 'models/' prefix as per API)
         model_names = [
-            'models/gemini-2.5-flash',   # Primary: fast and capable
-            'models/gemini-2.5-pro',     # Secondary: for complex reasoning
-            'models/gemini-2.0-flash',   # Fallback 1
-            'models/gemini-flash-latest' # Fallback 2: always points to latest
+            'models/gemini-2.5-flash-lite', # Primary: lowest latency, enough for this prompt
+            'models/gemini-2.5-flash',      # Secondary: fast and capable
+            'models/gemini-2.0-flash',      # Fallback 1
+            'models/gemini-flash-latest',   # Fallback 2: always points to latest
+            'models/gemini-2.5-pro'         # Last resort: slow and costly per call
         ]
         
-        for model_name in model_names:
-            try:
-                self.model = genai.GenerativeModel(model_name)
-                self.model_name = model_name
-                print(f"✓ Using model: {model_name}")
-                break
-            except Exception as e:
-                print(f"✗ Model {model_name} failed: {str(e)[:100]}")
-                continue
+        if self.model is None:
+            for model_name in model_names:
+                try:
+                    self.model = genai.GenerativeModel(model_name)
+                    self.model_name = model_name
+                    print(f"✓ Using model: {model_name}")
+                    self._save_cached_model_name(model_name)
+                    break
+                except Exception as e:
+                    print(f"✗ Model {model_name} failed: {str(e)[:100]}")
+                    continue
         
         if self.model is None:
             print("⚠ WARNING: No Gemini model available. Using fallback only.")
@@ -57,6 +154,30 @@ class MVP_GeminiAnalyzer:
             notes=f"Gemini {self.model_name if self.model_name else 'fallback'} with structured JSON output"
         )
     
+    def _load_cached_model_name(self):
+        """Return the cached model name, or None on cache miss"""
+        try:
+            with open(_MODEL_CACHE_PATH, "r") as f:
+                return json.load(f).get("model")
+        except (OSError, ValueError, AttributeError):
+            return None
+    
+    def _save_cached_model_name(self, model_name):
+        """Remember the working model for the next startup"""
+        try:
+            os.makedirs(os.path.dirname(_MODEL_CACHE_PATH), exist_ok=True)
+            with open(_MODEL_CACHE_PATH, "w") as f:
+                json.dump({"model": model_name, "ts": time.time()}, f)
+        except OSError as e:
+            print(f"  ⚠ Could not cache model name: {e}")
+    
+    def invalidate_model_cache(self):
+        """Forget the cached model so the next startup probes again"""
+        try:
+            os.remove(_MODEL_CACHE_PATH)
+        except OSError:
+            pass
+    
     def analyze_screen(self, screenshot_image, window_info):
         """Analyze screenshot - MVP and Blueprint ready"""
         # If no model available, return fallback immediately
@@ -64,37 +185,34 @@ class MVP_GeminiAnalyzer:
             return self._fallback_analysis(window_info)
         
         try:
-            # MVP prompt - simple but effective
-            prompt = """
-            Analyze this developer's screen. Return ONLY valid JSON:
-            {
-                "app_detected": "guess the main application (VS Code, Chrome, Terminal, etc.)",
-                "primary_activity": "coding/debugging/reading/browsing/designing/writing",
-                "visible_text_summary": "brief summary of text on screen (max 100 characters)",
-                "potential_errors": ["list", "of", "possible", "errors", "or", "issues"],
-                "confidence_score": 0.95,
-                "suggested_context": "web_dev/data_analysis/writing/unknown"
-            }
-            
-            Be concise. Focus on what's actually visible.
-            Important: Return ONLY the JSON object, no other text.
-            """
+            # Skip the API call entirely if this screen was just analyzed
+            title = window_info.get('title') if window_info else None
+            frame_hash = self._dhash(screenshot_image)
+            cached = self._lookup_frame(frame_hash, title)
+            if cached is not None:
+                print("  ✓ Screen unchanged, reusing previous analysis")
+                return cached
+            
+            prompt = _PROMPT
             
             # Add window context if available
             if window_info and window_info.get('app') != 'unknown_app':
                 prompt = f"Window context: {window_info['app']}\n" + prompt
             
+            # Stay within the per-minute request budget
+            if not self._bucket.acquire():
+                print("  ⏳ Gemini rate limit reached, using fallback")
+                return self._rate_limited_analysis(window_info)
+            
             # Call Gemini
             self.api_calls += 1
             
-            # Convert PIL image to bytes for Gemini
-            img_byte_arr = BytesIO()
-            screenshot_image.save(img_byte_arr, format='PNG')
-            img_byte_arr = img_byte_arr.getvalue()
+            # Convert PIL image to JPEG bytes for Gemini (much smaller than PNG)
+            image_bytes = self._encode_jpeg(self._downscale(screenshot_image))
             
-            response = self.model.generate_content([
+            response = self._generate_with_retry([
                 prompt,
-                {"mime_type": "image/png", "data": img_byte_arr}
+                {"mime_type": "image/jpeg", "data": image_bytes}
             ])
             
             # Extract JSON (Gemini sometimes wraps it)
@@ -106,8 +224,8 @@ class MVP_GeminiAnalyzer:
             elif response_text.startswith("```"):
                 response_text = response_text[3:-3]
             
-            # Parse
-            analysis = json.loads(response_text)
+            # Parse (raises json.JSONDecodeError, handled below)
+            analysis = loads(response_text)
             
             # Add metadata
             analysis["api_calls"] = self.api_calls
@@ -122,6 +240,8 @@ class MVP_GeminiAnalyzer:
             if window_info:
                 analysis["window_title"] = window_info.get("title", "Unknown")
             
+            self._remember_frame(frame_hash, title, analysis)
+            
             print(f"  ✓ Gemini analysis successful")
             print(f"    App: {analysis.get('app_detected')}")
             print(f"    Activity: {analysis.get('primary_activity')}")
@@ -136,6 +256,81 @@ class MVP_GeminiAnalyzer:
             print(f"  ⚠ Gemini error: {str(e)[:100]}")
             return self._fallback_analysis(window_info)
     
+    @staticmethod
+    def _downscale(image):
+        """Shrink to fit _UPLOAD_MAX_SIZE keeping aspect ratio (original untouched)"""
+        width, height = image.size
+        scale = min(_UPLOAD_MAX_SIZE[0] / width, _UPLOAD_MAX_SIZE[1] / height)
+        if scale >= 1:
+            return image
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        return image.resize(size, Image.BILINEAR)
+    
+    def _encode_jpeg(self, image):
+        """Encode an image as JPEG, reusing this thread's buffer"""
+        buf = getattr(self._local, "buf", None)
+        if buf is None:
+            buf = self._local.buf = BytesIO()
+        buf.seek(0)
+        buf.truncate()
+        image.convert("RGB").save(buf, format="JPEG", quality=80, subsampling=2)
+        return buf.getvalue()
+    
+    @staticmethod
+    def _dhash(image):
+        """64-bit difference hash of a 9x8 grayscale thumbnail"""
+        # reducing_gap box-reduces in C first; the resize dominates the hash cost
+        small = image.resize((9, 8), Image.BILINEAR, reducing_gap=2.0)
+        pixels = small.convert("L").tobytes()
+        value = 0
+        for row in range(0, 72, 9):
+            for col in range(row, row + 8):
+                value = (value << 1) | (pixels[col + 1] > pixels[col])
+        return value
+    
+    def _lookup_frame(self, frame_hash, title):
+        """Return a copy of a recent cached analysis for a near-identical frame of the same window"""
+        if not title or title == "Unknown":
+            return None
+        
+        match = None
+        cutoff = time.monotonic() - _FRAME_CACHE_TTL
+        for key in reversed(self._frame_cache):
+            cached_hash, cached_title = key
+            if (cached_title == title and self._frame_cache[key][0] >= cutoff
+                    and bin(cached_hash ^ frame_hash).count("1") <= _FRAME_MAX_DISTANCE):
+                match = key
+                break
+        
+        if match is None:
+            return None
+        
+        self._frame_cache.move_to_end(match)
+        analysis = dict(self._frame_cache[match][1])
+        analysis["cache_hit"] = True
+        return analysis
+    
+    def _remember_frame(self, frame_hash, title, analysis):
+        """Store an analysis, evicting the least recently used entry"""
+        if not title or title == "Unknown":
+            return
+        self._frame_cache[(frame_hash, title)] = (time.monotonic(), analysis)
+        self._frame_cache.move_to_end((frame_hash, title))
+        if len(self._frame_cache) > _FRAME_CACHE_SIZE:
+            self._frame_cache.popitem(last=False)
+    
+    def _generate_with_retry(self, contents):
+        """Call Gemini, backing off exponentially on 429 / 5xx responses"""
+        for attempt in range(_MAX_API_ATTEMPTS):
+            try:
+                return self.model.generate_content(contents)
+            except (google_exceptions.ResourceExhausted, google_exceptions.ServerError) as e:
+                if attempt == _MAX_API_ATTEMPTS - 1:
+                    raise
+                delay = 2 ** attempt + random.random()
+                print(f"  ⏳ Gemini busy ({type(e).__name__}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+    
     def _fallback_analysis(self, window_info):
         """Better fallback when Gemini fails"""
         # Try to get active window title
@@ -146,8 +341,10 @@ class MVP_GeminiAnalyzer:
             window_title = window_info.get("title", "Unknown")
             app_name = window_info.get("app", "Unknown")
         
-        # Try to detect app from window title
-        detected_app = self._guess_app_from_window(window_title)
+        # Use the app already detected at capture time, else classify the title
+        detected_app = window_info.get("app_display") if window_info else None
+        if detected_app is None:
+            detected_app = detect_app(window_title)[1]
         if detected_app != "Unknown":
             app_name = detected_app
         
@@ -164,68 +361,24 @@ class MVP_GeminiAnalyzer:
             "model_used": "fallback"
         }
     
-    def _guess_app_from_window(self, title):
-        """Guess app from window title"""
-        if not title or title == "Unknown":
-            return "Unknown"
-        
-        title_lower = title.lower()
-        
-        app_map = {
-            "chrome": "Chrome",
-            "firefox": "Firefox",
-            "edge": "Edge",
-            "vscode": "VS Code",
-            "visual studio code": "VS Code",
-            "pycharm": "PyCharm",
-            "terminal": "Terminal",
-            "cmd": "Command Prompt",
-            "powershell": "PowerShell",
-            "bash": "Terminal",
-            "flutterflow": "FlutterFlow",
-            "figma": "Figma",
-            "notion": "Notion",
-            "excel": "Excel",
-            "word": "Word",
-            "powerpoint": "PowerPoint",
-            "slack": "Slack",
-            "discord": "Discord",
-            "teams": "Teams"
-        }
-        
-        for key, app in app_map.items():
-            if key in title_lower:
-                return app
-        
-        # Check for common patterns
-        if "google" in title_lower and "chrome" in title_lower:
-            return "Chrome"
-        elif "microsoft" in title_lower and "edge" in title_lower:
-            return "Edge"
-        elif "visual studio" in title_lower:
-            return "VS Code"
-        elif "python" in title_lower:
-            return "Python IDE"
-        
-        return "Unknown"
+    def _rate_limited_analysis(self, window_info):
+        """Fallback for the local request budget: not an API failure, so no error entries"""
+        analysis = self._fallback_analysis(window_info)
+        analysis["visible_text_summary"] = f"Gemini rate limit reached. Window: {analysis['window_context'][:50]}..."
+        analysis["potential_errors"] = []
+        analysis["rate_limited"] = True
+        return analysis
     
     def _simple_intent_detection(self, analysis):
         """MVP: Simple intent - Blueprint: advanced classifier"""
         activity = analysis.get("primary_activity", "").lower()
         summary = analysis.get("visible_text_summary", "").lower()
         
-        if "error" in activity or "debug" in activity or "error" in summary:
-            return "debugging"
-        elif "code" in activity or "program" in activity or "script" in summary:
-            return "coding"
-        elif "read" in activity or "article" in summary or "paper" in summary:
-            return "reading"
-        elif "design" in activity or "ui" in summary or "ux" in summary:
-            return "designing"
-        elif "write" in activity or "document" in summary:
-            return "writing"
-        else:
-            return "unknown"
+        matched = {_ACTIVITY_KEYWORDS[k] for k in _ACTIVITY_RE.findall(activity)}
+        matched.update(_SUMMARY_KEYWORDS[k] for k in _SUMMARY_RE.findall(summary))
+        
+        # First intent in precedence order wins
+        return next((intent for intent in _INTENT_RULES if intent in matched), "unknown")
     
     def blueprint_upgrade_hooks(self):
         """Future blueprint enhancements"""
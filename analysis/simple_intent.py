@@ -1,3 +1,6 @@
+import re
+
+
 class MVP_IntentDetector:
     """
     MVP: Simple rule-based intent detection
@@ -11,27 +14,29 @@ class MVP_IntentDetector:
             "design": ["design", "ui", "ux", "figma", "sketch"],
             "communication": ["email", "chat", "message", "slack", "discord"]
         }
+        
+        # All keywords in one pattern: a single C-level scan per call.
+        # The lookahead reports overlapping matches too ("ui" inside "build").
+        self._kw2intent = {kw: intent for intent, kws in self.rules.items() for kw in kws}
+        keywords = sorted(self._kw2intent, key=len, reverse=True)
+        self._keyword_re = re.compile("(?=(" + "|".join(map(re.escape, keywords)) + "))")
     
     def detect(self, analysis_text, window_app):
         """Simple rule-based intent detection"""
         text_lower = analysis_text.lower()
         app_lower = window_app.lower() if window_app else ""
         
-        scores = {}
+        # Each keyword counts once, whether found in the text or the app
+        found = set(self._keyword_re.findall(text_lower + "\n" + app_lower))
         
-        # Check rules
-        for intent, keywords in self.rules.items():
-            score = 0
-            for keyword in keywords:
-                if keyword in text_lower or keyword in app_lower:
-                    score += 1
-            
-            scores[intent] = score
+        scores = {intent: 0 for intent in self.rules}
+        for keyword in found:
+            scores[self._kw2intent[keyword]] += 1
         
-        # Get best match
+        # Get best match (ties go to the first intent in self.rules)
         best_intent = max(scores.items(), key=lambda x: x[1])
         
         if best_intent[1] > 0:
             return best_intent[0]
         
-        return "unknown"
\ No newline at end of file
+        return "unknown"
@@ -0,0 +1,67 @@
+"""
+App Detection - shared window-title classifier
+Used by MVP_Screenshot (per capture) and MVP_GeminiAnalyzer (fallback)
+"""
+import re
+
+# Window-title pattern -> (canonical app id, display name), in precedence order.
+# Editors, terminals and design tools come first (the original capture-side
+# order); browsers and office apps only win when none of those match
+_APP_PATTERNS = {
+    "chrome": ("chrome", "Chrome"),
+    "google chrome": ("chrome", "Chrome"),
+    "visual studio code": ("vscode", "VS Code"),
+    "vscode": ("vscode", "VS Code"),
+    "vs code": ("vscode", "VS Code"),
+    "pycharm": ("pycharm", "PyCharm"),
+    "terminal": ("terminal", "Terminal"),
+    "cmd": ("terminal", "Command Prompt"),
+    "powershell": ("terminal", "PowerShell"),
+    "bash": ("terminal", "Terminal"),
+    "shell": ("terminal", "Terminal"),
+    "flutterflow": ("flutterflow", "FlutterFlow"),
+    "figma": ("figma", "Figma"),
+    "notion": ("notion", "Notion"),
+    "slack": ("slack", "Slack"),
+    "discord": ("discord", "Discord"),
+    "firefox": ("firefox", "Firefox"),
+    "edge": ("edge", "Edge"),
+    "excel": ("excel", "Excel"),
+    "word": ("word", "Word"),
+    "powerpoint": ("powerpoint", "PowerPoint"),
+    "teams": ("teams", "Teams")
+}
+_PATTERN_PRIORITY = {pattern: i for i, pattern in enumerate(_APP_PATTERNS)}
+
+# Whole words only ("knowledge.md" is not Edge, "Password" is not Word);
+# longest alternatives first so "visual studio code" beats shorter overlaps
+_APP_RE = re.compile(
+    r"\b(?:" + "|".join(re.escape(p) for p in sorted(_APP_PATTERNS, key=len, reverse=True)) + r")\b",
+    re.IGNORECASE
+)
+
+
+def detect_app(title):
+    """Classify a window title in one regex pass -> (app_id, display_name)"""
+    if not title:
+        return "unknown_app", "Unknown"
+
+    # If several patterns match, the earliest entry in _APP_PATTERNS wins
+    matches = {m.group(0).lower() for m in _APP_RE.finditer(title)}
+    if matches:
+        return _APP_PATTERNS[min(matches, key=_PATTERN_PRIORITY.__getitem__)]
+
+    # Try to extract the id from the title: first word, special chars removed
+    words = title.split()
+    if words:
+        app_id = words[0].replace("[", "").replace("]", "").replace("-", "")[:20].lower()
+    else:
+        app_id = "unknown_app"
+
+    title_lower = title.lower()
+    if "visual studio" in title_lower:
+        return app_id, "VS Code"
+    elif "python" in title_lower:
+        return app_id, "Python IDE"
+
+    return app_id, "Unknown"
@@ -2,16 +2,24 @@
 Event Stream - Phase 1.4 Blueprint Upgrade
 Tracks window changes and user activity patterns
 """
+import bisect
+import itertools
 import time
+from collections import Counter, deque
 from datetime import datetime
 from dataclasses import dataclass
-from typing import List, Dict, Any, Optional
-import json
+from typing import Deque, Dict, Any, Optional
 import os
 
+from core.jsonio import dumps, dumps_line
+from core.writer import write_atomic
+
 @dataclass
 class UserEvent:
     """Standardized event for user activity"""
+    # No per-instance __dict__; _iso caches the formatted timestamp
+    __slots__ = ("event_type", "timestamp", "app", "window_title", "data", "_iso")
+    
     event_type: str  # 'window_change', 'capture', 'analysis', 'suggestion', 'workflow'
     timestamp: float
     app: str
@@ -21,17 +29,24 @@ class UserEvent:
     def to_dict(self):
         """Convert event to dictionary safely"""
         # Handle None values gracefully
-        safe_window_title = str(self.window_title)[:100] if self.window_title else ""
+        title = self.window_title
+        if isinstance(title, str):
+            safe_window_title = title[:100]
+        else:
+            safe_window_title = str(title)[:100] if title else ""
         safe_app = self.app if self.app else "unknown"
         safe_data = self.data if self.data else {}
         
-        # Handle timestamp conversion
-        iso_time = ""
-        if self.timestamp:
-            try:
-                iso_time = datetime.fromtimestamp(self.timestamp).isoformat()
-            except (ValueError, OSError):
-                iso_time = datetime.now().isoformat()
+        # Handle timestamp conversion (formatted once, then cached)
+        iso_time = getattr(self, "_iso", None)
+        if iso_time is None:
+            iso_time = ""
+            if self.timestamp:
+                try:
+                    iso_time = datetime.fromtimestamp(self.timestamp).isoformat()
+                except (ValueError, OSError):
+                    iso_time = datetime.now().isoformat()
+            self._iso = iso_time
         
         return {
             "type": self.event_type,
@@ -43,19 +58,67 @@ class UserEvent:
         }
 
 
+# Oldest events fall off automatically once the buffer is full
+MAX_EVENTS = 1000
+
+# Per-minute activity buckets kept for get_user_activity_summary (24h)
+ACTIVITY_WINDOW_MINUTES = 24 * 60
+
+# Every event is appended as one JSON line; stats are rewritten on flush
+EVENT_LOG_FILE = "memory/event_stream.ndjson"
+EVENT_STATS_FILE = "memory/event_stream_stats.json"
+
+
 class EventStream:
     def __init__(self, config, tracker):
         self.config = config
         self.tracker = tracker
-        self.events: List[UserEvent] = []
+        self.events: Deque[UserEvent] = deque(maxlen=MAX_EVENTS)
         self.last_window: Optional[str] = None
         
+        # Running per-type counts and sorted timestamps (parallel to
+        # self.events) so get_stats never rescans the whole buffer
+        self._counts = Counter()
+        self._times: Deque[float] = deque(maxlen=MAX_EVENTS)
+        
+        # (minute, per-app Counter, per-type Counter), oldest first
+        self._per_min: Deque[tuple] = deque(maxlen=ACTIVITY_WINDOW_MINUTES)
+        
+        # Unbuffered append-only log: one write() per event, nothing rewritten
+        os.makedirs(os.path.dirname(EVENT_LOG_FILE), exist_ok=True)
+        self._log_fp = open(EVENT_LOG_FILE, "ab", buffering=0)
+        
         tracker.add_tech_debt(
             item="Basic event stream",
             reason="MVP Phase 1.4 implementation",
             blueprint_feature="Real-time event processing + ML pattern detection"
         )
     
+    def _append(self, event):
+        """Record an event and update the running counters"""
+        if len(self.events) == self.events.maxlen:
+            # The deque is about to drop its oldest event
+            self._counts[self.events[0].event_type] -= 1
+        self.events.append(event)
+        self._counts[event.event_type] += 1
+        self._times.append(event.timestamp)
+        
+        self._bucket(event)
+        
+        try:
+            self._log_fp.write(dumps_line(event.to_dict(), default=str))
+        except (OSError, ValueError) as e:
+            print(f"  ⚠ Could not append event: {e}")
+    
+    def _bucket(self, event):
+        """Count an event in its per-minute activity bucket"""
+        minute = int(event.timestamp // 60)
+        if not self._per_min or self._per_min[-1][0] != minute:
+            self._per_min.append((minute, Counter(), Counter()))
+        _, apps, types = self._per_min[-1]
+        apps[event.app] += 1
+        types[event.event_type] += 1
+    
     def log_capture(self, window_info, filename):
         """Log screenshot capture event"""
         # Safely extract values with defaults
@@ -68,7 +131,7 @@ class EventStream:
             app=app,
             window_title=str(window_title),  # Ensure string
             data={
-                "filename": filename or "unknown",
+                "filename": filename or "in_memory",
                 "type": "screenshot",
                 "window_info": {
                     "app": app,
@@ -76,7 +139,7 @@ class EventStream:
                 }
             }
         )
-        self.events.append(event)
+        self._append(event)
         
         # Check for window changes
         self._detect_window_change(window_info)
@@ -105,7 +168,7 @@ class EventStream:
                 "local_mode": analysis_result.get("local_mode", False)
             }
         )
-        self.events.append(event)
+        self._append(event)
     
     def log_suggestion(self, suggestion, context):
         """Log suggestion event"""
@@ -125,7 +188,7 @@ class EventStream:
                 "suggestion_length": len(str(suggestion_text))
             }
         )
-        self.events.append(event)
+        self._append(event)
     
     def _detect_window_change(self, window_info):
         """Detect when user switches windows"""
@@ -145,7 +208,7 @@ class EventStream:
                     "app_change": True if self.last_window else False
                 }
             )
-            self.events.append(event)
+            self._append(event)
             self.last_window = current_window
     
     def get_stats(self):
@@ -160,15 +223,20 @@ class EventStream:
         
         # Check last 5 minutes
         cutoff = time.time() - 300
-        recent = [e for e in self.events if e.timestamp > cutoff]
+        start = bisect.bisect_right(self._times, cutoff)
+        recent = list(itertools.islice(self.events, start, None))
+        
+        counts = {
+            "total_events": len(self.events),
+            "window_changes": self._counts["window_change"],
+            "captures": self._counts["capture"],
+            "analyses": self._counts["analysis"],
+            "suggestions": self._counts["suggestion"]
+        }
         
         if not recent:
             return {
-                "total_events": len(self.events),
-                "window_changes": sum(1 for e in self.events if e.event_type == "window_change"),
-                "captures": sum(1 for e in self.events if e.event_type == "capture"),
-                "analyses": sum(1 for e in self.events if e.event_type == "analysis"),
-                "suggestions": sum(1 for e in self.events if e.event_type == "suggestion"),
+                **counts,
                 "active_patterns": patterns,
                 "recent_events": len(recent)
             }
@@ -201,61 +269,49 @@ class EventStream:
             patterns["working_session"] = True
         
         return {
-            "total_events": len(self.events),
-            "window_changes": sum(1 for e in self.events if e.event_type == "window_change"),
-            "captures": sum(1 for e in self.events if e.event_type == "capture"),
-            "analyses": sum(1 for e in self.events if e.event_type == "analysis"),
-            "suggestions": sum(1 for e in self.events if e.event_type == "suggestion"),
+            **counts,
             "active_patterns": patterns,
             "recent_events": len(recent),
             "first_event": self.events[0].timestamp if self.events else None,
             "last_event": self.events[-1].timestamp if self.events else None
         }
     
-    def save_events(self):
-        """Save events to JSON file"""
+    def flush_stats(self):
+        """Atomically write aggregate stats (events are already on disk)"""
         try:
-            # Create memory directory if it doesn't exist
-            os.makedirs("memory", exist_ok=True)
-            
-            # Convert events to dictionaries (handle empty list)
-            events_data = []
-            if self.events:
-                # Get last 100 events (or all if less than 100)
-                events_to_save = self.events[-100:] if len(self.events) > 100 else self.events
-                events_data = [e.to_dict() for e in events_to_save]
-            
-            # Prepare the data structure
             save_data = {
-                "version": "1.0.0",
+                "version": "1.1.0",
+                "event_log": EVENT_LOG_FILE,
                 "total_events": len(self.events),
-                "saved_events": len(events_data),
-                "events": events_data,
                 "last_updated": datetime.now().isoformat(),
                 "stats": self.get_stats()
             }
             
-            # Save to file
-            with open("memory/event_stream.json", "w") as f:
-                json.dump(save_data, f, indent=2, default=str)
-            
-            # print(f"  ✓ Saved {len(events_data)} events to memory/event_stream.json")
+            # Readers never see a partial file
+            write_atomic(EVENT_STATS_FILE, dumps(save_data, indent=True, default=str), fsync=False)
             
         except Exception as e:
-            print(f"  ⚠ Could not save events: {e}")
-            # Try minimal save
-            try:
-                with open("memory/event_stream_backup.json", "w") as f:
-                    f.write(f"Error in main save: {e}\n")
-                    f.write(f"Total events: {len(self.events)}\n")
-            except:
-                pass
+            print(f"  ⚠ Could not save event stats: {e}")
+    
+    # Old name, kept for existing callers
+    save_events = flush_stats
+    
+    def close(self):
+        """Write final stats and close the event log"""
+        self.flush_stats()
+        self._log_fp.close()
     
-    def clear_old_events(self, max_events=1000):
-        """Clear old events to prevent memory bloat"""
+    def clear_old_events(self, max_events=MAX_EVENTS):
+        """Trim to the most recent max_events (the buffer never exceeds MAX_EVENTS)"""
         if len(self.events) > max_events:
             # Keep only the most recent events
-            self.events = self.events[-max_events:]
+            while len(self.events) > max_events:
+                self._counts[self.events.popleft().event_type] -= 1
+                self._times.popleft()
+            # The activity buckets count only what is kept
+            self._per_min.clear()
+            for event in self.events:
+                self._bucket(event)
             print(f"  🧹 Cleared old events, keeping {len(self.events)} most recent")
     
     def get_recent_events(self, event_type=None, limit=10):
@@ -263,14 +319,22 @@ class EventStream:
         if event_type:
             filtered = [e for e in self.events if e.event_type == event_type]
             return filtered[-limit:] if filtered else []
-        return self.events[-limit:] if self.events else []
+        return list(itertools.islice(self.events, max(0, len(self.events) - limit), None))
     
     def get_user_activity_summary(self, hours=1):
-        """Get summary of user activity for last N hours"""
-        cutoff = time.time() - (hours * 3600)
-        recent = [e for e in self.events if e.timestamp > cutoff]
+        """Get summary of user activity for last N hours (minute resolution, at most 24h)"""
+        # Buckets only reach back ACTIVITY_WINDOW_MINUTES
+        hours = min(hours, ACTIVITY_WINDOW_MINUTES // 60)
+        cutoff = int(time.time() // 60) - int(hours * 60)
         
-        if not recent:
+        # Walk back from the newest bucket; at most hours*60 buckets are touched
+        buckets = []
+        for bucket in reversed(self._per_min):
+            if bucket[0] <= cutoff:
+                break
+            buckets.append(bucket)
+        
+        if not buckets:
             return {
                 "total_events": 0,
                 "apps_used": [],
@@ -278,23 +342,21 @@ class EventStream:
                 "suggestions_given": 0
             }
         
-        # Count apps used
-        app_counter = {}
-        for event in recent:
-            app = event.app
-            app_counter[app] = app_counter.get(app, 0) + 1
+        # Merge oldest first so apps_used keeps first-seen order
+        app_counter = Counter()
+        suggestions = 0
+        for _, apps, types in reversed(buckets):
+            app_counter.update(apps)
+            suggestions += types["suggestion"]
         
         # Find most active app
-        most_active = max(app_counter.items(), key=lambda x: x[1]) if app_counter else (None, 0)
-        
-        # Count suggestions
-        suggestions = sum(1 for e in recent if e.event_type == "suggestion")
+        most_active = max(app_counter.items(), key=lambda x: x[1])
         
         return {
-            "total_events": len(recent),
+            "total_events": sum(app_counter.values()),
             "apps_used": list(app_counter.keys()),
             "most_active_app": most_active[0],
             "most_active_count": most_active[1],
             "suggestions_given": suggestions,
             "time_period_hours": hours
-        }
\ No newline at end of file
+        }
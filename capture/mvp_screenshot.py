@@ -1,10 +1,15 @@
+import atexit
 import time
 from datetime import datetime
 import os
-from PIL import ImageGrab
+import queue
+import threading
+from PIL import Image
 import mss
 import mss.tools
 
+from capture.app_detect import detect_app
+
 class MVP_Screenshot:
     """
     MVP: Simple screen capture
@@ -19,6 +24,17 @@ class MVP_Screenshot:
         self.sct = mss.mss()
         self.screenshot_count = 0
         
+        # Writing PNGs is opt-in: most captures are only ever analyzed
+        self.persist_screenshots = getattr(config, "persist_screenshots", False)
+        
+        # PNG encoding + disk writes happen on a background thread so
+        # capture() can hand the image to the analyzer immediately
+        self._write_queue = queue.Queue()
+        self._writer = threading.Thread(target=self._drain_writes, daemon=True)
+        self._writer.start()
+        # The writer is a daemon thread; drain the queue before exit
+        atexit.register(self.flush)
+        
         # Try to get window info if pygetwindow is available
         self.has_window_info = False
         try:
@@ -38,14 +54,19 @@ class MVP_Screenshot:
     def capture(self):
         """Simple MVP capture - full screen only"""
         try:
-            # MVP: Simple full screen capture
-            screenshot = ImageGrab.grab()
+            # MVP: Simple full screen capture (primary monitor via mss)
+            sct_img = self.sct.grab(self.sct.monitors[1])
+            # Decode mss's raw BGRA buffer straight to RGB in C; sct_img.rgb
+            # would first build a full-frame RGB copy in Python
+            screenshot = Image.frombuffer("RGB", sct_img.size, sct_img.raw, "raw", "BGRX", 0, 1)
             
-            # Save with timestamp
+            # Save with timestamp - only when persistence is enabled; the
+            # analyzer works from the in-memory image either way
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{self.config.screenshots_dir}/mvp_{timestamp}.png"
-            
-            screenshot.save(filename)
+            filename = None
+            if self.persist_screenshots:
+                filename = f"{self.config.screenshots_dir}/mvp_{timestamp}.png"
+                self._write_queue.put((screenshot, filename))
             self.screenshot_count += 1
             
             # Get better window info if possible
@@ -67,10 +88,27 @@ class MVP_Screenshot:
             print(f"  ✗ Capture error: {e}")
             return None
     
+    def _drain_writes(self):
+        """Background writer: save queued screenshots to disk"""
+        while True:
+            image, filename = self._write_queue.get()
+            try:
+                # compress_level=1 is ~4x cheaper than the default zlib level
+                image.save(filename, optimize=False, compress_level=1)
+            except Exception as e:
+                print(f"  ✗ Screenshot save error: {e}")
+            finally:
+                self._write_queue.task_done()
+    
+    def flush(self):
+        """Block until all queued screenshots are written"""
+        self._write_queue.join()
+    
     def _get_window_info(self):
         """Get window information - improved"""
         window_info = {
             "app": "unknown_app",
+            "app_display": "Unknown",
             "title": "Unknown",
             "has_pygetwindow": self.has_window_info
         }
@@ -80,7 +118,7 @@ class MVP_Screenshot:
                 active = self.pygetwindow.getActiveWindow()
                 if active:
                     window_info["title"] = active.title
-                    window_info["app"] = self._extract_app_name(active.title)
+                    window_info["app"], window_info["app_display"] = detect_app(active.title)
                     window_info["position"] = {
                         "left": active.left,
                         "top": active.top,
@@ -92,39 +130,6 @@ class MVP_Screenshot:
         
         return window_info
     
-    def _extract_app_name(self, title):
-        """Extract app name from window title"""
-        if not title:
-            return "unknown_app"
-        
-        title_lower = title.lower()
-        
-        # Common app detection
-        app_patterns = {
-            "chrome": ["chrome", "google chrome"],
-            "vscode": ["visual studio code", "vscode", "vs code"],
-            "pycharm": ["pycharm"],
-            "terminal": ["terminal", "cmd", "powershell", "bash", "shell"],
-            "flutterflow": ["flutterflow"],
-            "figma": ["figma"],
-            "notion": ["notion"],
-            "slack": ["slack"],
-            "discord": ["discord"]
-        }
-        
-        for app_name, patterns in app_patterns.items():
-            if any(pattern in title_lower for pattern in patterns):
-                return app_name
-        
-        # Try to extract from title
-        words = title.split()
-        if words:
-            # Take first word, remove special chars
-            first_word = words[0].replace("[", "").replace("]", "").replace("-", "")
-            return first_word[:20].lower()
-        
-        return "unknown_app"
-    
     def blueprint_upgrade_hook(self):
         """This method will be replaced in blueprint"""
         # Placeholder for blueprint features
@@ -6,9 +6,14 @@ MVP Analyzer System - IMPROVED VERSION
 
 import os
 import json
+import atexit
 import time
 import re
-from typing import Dict, Any
+import hashlib
+import textwrap
+from collections import OrderedDict
+from io import BytesIO
+from typing import Dict, Any, Optional
 
 # Load environment variables from .env file
 try:
@@ -20,6 +25,249 @@ except ImportError:
 import google.generativeai as genai
 from PIL import Image
 
+from core.jsonio import dumps, loads
+from core.writer import BackgroundWriter
+
+# Optional DCT-domain JPEG downscaling (pip install jpegtran-cffi)
+try:
+    from jpegtran import JPEGImage
+    _HAS_JPEGTRAN = True
+except ImportError:
+    _HAS_JPEGTRAN = False
+
+# Optional libjpeg-turbo encoder (pip install simplejpeg, needs numpy)
+try:
+    import numpy as np
+    import simplejpeg
+    _HAS_SIMPLEJPEG = True
+except ImportError:
+    _HAS_SIMPLEJPEG = False
+
+# Optional Aho-Corasick automaton for the text extractors (pip install pyahocorasick)
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Longest edges sent to Gemini (smaller image = faster processing)
+THUMBNAIL_SIZE = (800, 600)
+JPEG_QUALITY = 75
+
+# Analyses kept per analyzer, keyed by a hash of the uploaded image bytes
+RESULT_CACHE_SIZE = 128
+# A near-identical capture (a moved cursor, a blinking caret) may reuse the
+# previous Gemini analysis: same window title, 64-bit dHashes at most
+# RESULT_CACHE_MAX_DISTANCE bits apart, and at most RESULT_CACHE_FUZZY_TTL
+# seconds old. dHash barely tells screens apart (different code, an added
+# error pane), so this match is never made against older or reloaded entries
+RESULT_CACHE_MAX_DISTANCE = 4
+RESULT_CACHE_FUZZY_TTL = 10.0
+# Exact-content entries are persisted here so they survive restarts
+RESULT_CACHE_FILE = "memory/gemini_result_cache.json"
+
+# IMPROVED PROMPT - Forces JSON response (dedented, enum lists comma-joined)
+_PROMPT = textwrap.dedent("""
+    Analyze this developer screenshot. Return ONLY valid JSON, no other text.
+    JSON format: {"app": str, "activity": str, "confidence": 0.0-1.0, "error_detected": bool, "suggestion": "brief suggestion"}
+    app: vscode,visual_studio,pycharm,chrome,firefox,edge,terminal,command_prompt,powershell,file_explorer,notepad,word,excel,powerpoint,slack,discord,teams,spotify,unknown
+    activity: coding,debugging,browsing,reading,writing,chatting,presenting,file_management,system_admin,gaming,unknown
+    Look for: IDE windows, browser tabs, terminal text, error messages, code.
+""").strip()
+
+# Generate with stricter config
+_GENERATION_CONFIG = genai.types.GenerationConfig(
+    max_output_tokens=200,
+    temperature=0.1,
+    response_mime_type="application/json"  # Ask for JSON directly
+)
+
+# Label -> substrings that identify it in a free-text response, in precedence order
+APP_PATTERNS = {
+    "vscode": ["vscode", "visual studio code", "code editor", "vs code"],
+    "visual_studio": ["visual studio", "visualstudio"],
+    "pycharm": ["pycharm", "jetbrains"],
+    "chrome": ["chrome", "google chrome", "browser"],
+    "firefox": ["firefox", "mozilla"],
+    "edge": ["edge", "microsoft edge"],
+    "terminal": ["terminal", "linux terminal", "mac terminal"],
+    "command_prompt": ["command prompt", "cmd.exe", "cmd window"],
+    "powershell": ["powershell", "ps1", "ps "],
+    "file_explorer": ["file explorer", "windows explorer", "folder"],
+    "notepad": ["notepad", "text editor"],
+    "word": ["word", "microsoft word"],
+    "excel": ["excel", "spreadsheet"],
+    "slack": ["slack"],
+    "discord": ["discord"],
+    "spotify": ["spotify", "music"]
+}
+
+ACTIVITY_PATTERNS = {
+    "coding": ["coding", "programming", "writing code", "developing"],
+    "debugging": ["debugging", "fixing error", "troubleshooting"],
+    "browsing": ["browsing", "reading", "searching", "web"],
+    "reading": ["reading", "viewing", "looking at"],
+    "writing": ["writing", "typing", "documenting"],
+    "chatting": ["chatting", "messaging", "communicating"],
+    "presenting": ["presenting", "presentation", "slides"],
+    "file_management": ["files", "folders", "organizing", "managing"],
+    "system_admin": ["system", "admin", "configuring", "settings"]
+}
+
+
+def _build_pattern_table(patterns):
+    """Flatten a label table -> ({pattern: (precedence, label)}, compiled regex)"""
+    label_by_pattern = {}
+    for rank, (label, pats) in enumerate(patterns.items()):
+        for pat in pats:
+            label_by_pattern.setdefault(pat, (rank, label))
+    # Lookahead reports one pattern per start position in a single pass; the
+    # alternation keeps table order so it is the highest-precedence one there
+    regex = re.compile("(?=(" + "|".join(map(re.escape, label_by_pattern)) + "))")
+    return label_by_pattern, regex
+
+
+_APP_LABEL_BY_PATTERN, _APP_RE = _build_pattern_table(APP_PATTERNS)
+_ACTIVITY_LABEL_BY_PATTERN, _ACTIVITY_RE = _build_pattern_table(ACTIVITY_PATTERNS)
+_PATTERN_TABLES = {
+    "app": (_APP_RE, _APP_LABEL_BY_PATTERN),
+    "activity": (_ACTIVITY_RE, _ACTIVITY_LABEL_BY_PATTERN)
+}
+
+
+def _build_automaton():
+    """One automaton over both tables: pattern -> {category: (precedence, label)}"""
+    entries = {}
+    for category, (_, label_by_pattern) in _PATTERN_TABLES.items():
+        for pattern, ranked_label in label_by_pattern.items():
+            entries.setdefault(pattern, {})[category] = ranked_label
+    automaton = ahocorasick.Automaton()
+    for pattern, by_category in entries.items():
+        automaton.add_word(pattern, by_category)
+    automaton.make_automaton()
+    return automaton
+
+
+_AUTOMATON = _build_automaton() if ahocorasick is not None else None
+
+
+def _match_label(category: str, text_lower: str) -> str:
+    """Label of the highest-precedence pattern of category found in text_lower"""
+    if _AUTOMATON is not None:
+        found = [by_category[category] for _, by_category in _AUTOMATON.iter(text_lower)
+                 if category in by_category]
+    else:
+        regex, label_by_pattern = _PATTERN_TABLES[category]
+        found = [label_by_pattern[p] for p in regex.findall(text_lower)]
+    return min(found)[1] if found else "unknown"
+
+# Canonical names for free-form app strings from Gemini. Each group requires all
+# of its keywords anywhere in the name; earlier groups win.
+_APP_NORMALIZE_RE = re.compile(
+    r"(?P<visual_studio>(?=.*visual)(?=.*studio))"
+    r"|(?P<vscode>(?=.*vs)(?=.*code))"
+    r"|(?P<command_prompt>(?=.*(?:command|cmd)))"
+    r"|(?P<powershell>(?=.*power)(?=.*shell))",
+    re.DOTALL
+)
+
+# Lowercase ASCII and map spaces to underscores in one str.translate pass
+_APP_TRANS = str.maketrans({" ": "_", **{chr(c): chr(c + 32) for c in range(0x41, 0x5B)}})
+
+
+def _chunk_text(chunk) -> str:
+    """Text of one streamed response chunk ("" for chunks without text parts)"""
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+
+def _json_complete(text: str) -> bool:
+    """True once streamed text already holds one complete JSON value"""
+    if not text.rstrip().endswith("}"):
+        return False
+    try:
+        loads(text)
+        return True
+    except json.JSONDecodeError:
+        return False
+
+
+def _load_thumbnail(screenshot_path: str) -> Image.Image:
+    """Open a screenshot already reduced to THUMBNAIL_SIZE"""
+    img = Image.open(screenshot_path)
+    # Lets libjpeg decode JPEGs at 1/2, 1/4 or 1/8 scale (no-op for PNG)
+    img.draft("RGB", THUMBNAIL_SIZE)
+    # Bilinear is cheaper than the default bicubic and plenty for model input
+    img.thumbnail(THUMBNAIL_SIZE, Image.BILINEAR)
+    return img
+
+
+def _encode_jpeg(img: Image.Image) -> bytes:
+    """Encode an image as JPEG_QUALITY JPEG bytes"""
+    # Convert only when needed (RGBA/P screenshots); RGB thumbnails are used as-is
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    if _HAS_SIMPLEJPEG:
+        # simplejpeg needs a C-contiguous uint8 array; asarray of an RGB image already is
+        pixels = np.ascontiguousarray(np.asarray(img))
+        return simplejpeg.encode_jpeg(pixels, quality=JPEG_QUALITY, colorspace="RGB")
+    buf = BytesIO()
+    img.save(buf, "JPEG", quality=JPEG_QUALITY)
+    return buf.getvalue()
+
+
+def _content_key(data: bytes) -> bytes:
+    """Digest identifying an image payload for the result cache"""
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _dhash(image_bytes: bytes) -> int:
+    """64-bit difference hash of an encoded (already thumbnailed) image"""
+    img = Image.open(BytesIO(image_bytes))
+    # JPEG payloads decode at 1/8 scale; the 9x8 resize dominates otherwise
+    img.draft("L", (72, 64))
+    pixels = img.convert("L").resize((9, 8), Image.BILINEAR).tobytes()
+    value = 0
+    for row in range(0, 72, 9):
+        for col in range(row, row + 8):
+            value = (value << 1) | (pixels[col + 1] > pixels[col])
+    return value
+
+
+def _load_request_image(screenshot_path: str, image: Image.Image = None):
+    """Upload bytes, MIME type and dHash for a screenshot (CPU-bound)"""
+    if image is not None:
+        # Captured frame handed over in memory: no disk read or PNG decode
+        image_bytes, mime_type = _encode_jpeg(_thumbnail_copy(image)), "image/jpeg"
+    else:
+        image_bytes, mime_type = _load_jpeg_payload(screenshot_path), "image/jpeg"
+    return image_bytes, mime_type, _dhash(image_bytes)
+
+
+def _thumbnail_copy(img: Image.Image) -> Image.Image:
+    """New image fitted to THUMBNAIL_SIZE; the original is left untouched"""
+    # Image.thumbnail works in place, but the capture module may still be saving img
+    scale = min(THUMBNAIL_SIZE[0] / img.width, THUMBNAIL_SIZE[1] / img.height)
+    if scale >= 1:
+        return img
+    size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    return img.resize(size, Image.BILINEAR, reducing_gap=2.0)
+
+
+def _load_jpeg_payload(screenshot_path: str) -> bytes:
+    """Thumbnail a screenshot straight to the JPEG bytes uploaded to Gemini"""
+    if _HAS_JPEGTRAN and screenshot_path.lower().endswith((".jpg", ".jpeg")):
+        # Scale in the DCT domain; full-resolution pixels are never decoded
+        jpeg = JPEGImage(screenshot_path)
+        scale = min(THUMBNAIL_SIZE[0] / jpeg.width, THUMBNAIL_SIZE[1] / jpeg.height)
+        if scale < 1:
+            jpeg = jpeg.downscale(max(1, int(jpeg.width * scale)), max(1, int(jpeg.height * scale)))
+        return jpeg.as_blob()
+    
+    return _encode_jpeg(_load_thumbnail(screenshot_path))
+
+
 class GeminiAnalyzer:
     """Improved Gemini Analyzer with better app detection"""
     
@@ -27,6 +275,14 @@ class GeminiAnalyzer:
         self.model_name = model_name
         self.api_key = os.environ.get("GEMINI_API_KEY", "demo_key")
         
+        # LRU of content hash -> analysis; identical screens skip the API call.
+        # Loaded from and written back to RESULT_CACHE_FILE.
+        self._cache = self._load_result_cache()
+        self._cache_writer = None
+        # (dHash, window title, monotonic time, analysis) of the last Gemini call,
+        # for near-identical follow-up captures (memory only)
+        self._last_frame = None
+        
         if self.api_key == "demo_key" or len(self.api_key) < 20:
             self.available = False
             print("⚠ Using local analyzer (no Gemini API key)")
@@ -40,64 +296,111 @@ class GeminiAnalyzer:
                 print(f"⚠ Gemini init failed: {e}")
                 self.available = False
     
-    def analyze(self, screenshot_path: str, context: Dict = None) -> Dict[str, Any]:
-        """Analyze screenshot with improved prompt and parsing"""
+    def analyze(self, screenshot_path: str, context: Dict = None, image: Image.Image = None) -> Dict[str, Any]:
+        """Analyze screenshot with improved prompt and parsing
+        
+        Pass the captured PIL image as image= to skip reading screenshot_path back from disk.
+        """
         start_time = time.time()
         
         if not self.available:
             return self._fast_fallback_analysis(screenshot_path, context)
         
         try:
-            # Open and resize image for faster processing
-            img = Image.open(screenshot_path)
-            img.thumbnail((800, 600))  # Smaller image = faster processing
-            
-            # IMPROVED PROMPT - Forces JSON response
-            prompt = """
-            Analyze this developer screenshot. Return ONLY valid JSON, no other text.
-            
-            JSON format:
-            {
-              "app": "app_name",
-              "activity": "activity_description",
-              "confidence": 0.0-1.0,
-              "error_detected": true/false,
-              "suggestion": "brief_suggestion"
-            }
-            
-            App options: vscode, visual_studio, pycharm, chrome, firefox, edge, terminal, 
-                        command_prompt, powershell, file_explorer, notepad, word, excel,
-                        powerpoint, slack, discord, teams, spotify, unknown
-            
-            Activity options: coding, debugging, browsing, reading, writing, chatting,
-                            presenting, file_management, system_admin, gaming, unknown
+            # Resize and encode once; the bytes are uploaded as-is (no SDK re-encode)
+            image_bytes, mime_type, frame_hash = _load_request_image(screenshot_path, image)
             
-            Look for: IDE windows, browser tabs, terminal text, error messages, code.
-            """
+            cache_key = _content_key(image_bytes)
+            title = (context or {}).get("window_title")
+            cached = self._cache_get(cache_key, frame_hash, title, start_time)
+            if cached is not None:
+                return cached
             
-            # Generate with stricter config
-            response = self.model.generate_content(
-                [prompt, img],
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=200,
-                    temperature=0.1,
-                    response_mime_type="application/json"  # Ask for JSON directly
-                )
-            )
+            contents, generation_config = self._build_request(image_bytes, mime_type)
+            # Stream so parsing can start as soon as the JSON object is complete
+            response_text = ""
+            for chunk in self.model.generate_content(contents, generation_config=generation_config, stream=True):
+                response_text += _chunk_text(chunk)
+                if _json_complete(response_text):
+                    break
             
-            elapsed = time.time() - start_time
-            
-            # Parse the response
-            analysis = self._parse_gemini_response(response.text, elapsed)
-            print(f"✓ Gemini: {analysis.get('app', 'unknown')} - {analysis.get('activity', 'unknown')} ({elapsed:.1f}s)")
-            
-            return analysis
+            return self._finish_analysis(response_text, cache_key, frame_hash, title, start_time)
             
         except Exception as e:
             elapsed = time.time() - start_time
             print(f"⚠ Gemini analysis error: {e}")
             return self._fallback_with_context(screenshot_path, context, elapsed)
     
+    def _build_request(self, image_bytes: bytes, mime_type: str = "image/jpeg"):
+        """Contents and generation config for one screenshot"""
+        return [_PROMPT, {"mime_type": mime_type, "data": image_bytes}], _GENERATION_CONFIG
+    
+    def _cache_get(self, cache_key: bytes, frame_hash: int, title: Optional[str], start_time: float):
+        """Copy of a cached analysis for this (or the previous near-identical) screenshot, or None"""
+        if cache_key in self._cache:
+            self._cache.move_to_end(cache_key)
+            cached = self._cache[cache_key]
+        else:
+            last = self._last_frame
+            if (last is None or not title or last[1] != title
+                    or time.monotonic() - last[2] > RESULT_CACHE_FUZZY_TTL
+                    or bin(last[0] ^ frame_hash).count("1") > RESULT_CACHE_MAX_DISTANCE):
+                return None
+            cached = last[3]
+        
+        elapsed = time.time() - start_time
+        print(f"✓ Gemini (cached): {cached.get('app', 'unknown')} - {cached.get('activity', 'unknown')}")
+        # cached_from keeps where the answer originally came from (gemini_json/gemini_text)
+        return {**cached, "mode": "cached", "cached_from": cached.get("mode"), "analysis_time": elapsed}
+    
+    def _finish_analysis(self, response_text: str, cache_key: bytes, frame_hash: int,
+                         title: Optional[str], start_time: float) -> Dict[str, Any]:
+        """Parse a Gemini response and remember it for identical screenshots"""
+        elapsed = time.time() - start_time
+        
+        # Parse the response
+        analysis = self._parse_gemini_response(response_text, elapsed)
+        print(f"✓ Gemini: {analysis.get('app', 'unknown')} - {analysis.get('activity', 'unknown')} ({elapsed:.1f}s)")
+        
+        self._cache[cache_key] = analysis
+        if len(self._cache) > RESULT_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        self._save_result_cache()
+        self._last_frame = (frame_hash, title, time.monotonic(), analysis)
+        
+        return {**analysis}
+    
+    def _load_result_cache(self) -> OrderedDict:
+        """Cached analyses from RESULT_CACHE_FILE (empty if missing or unreadable)"""
+        cache = OrderedDict()
+        try:
+            with open(RESULT_CACHE_FILE, 'rb') as f:
+                entries = loads(f.read())
+            # Stored oldest first as [content key hex, analysis]; older files
+            # also carry a dHash in between, which is ignored
+            for entry in entries[-RESULT_CACHE_SIZE:]:
+                cache[bytes.fromhex(entry[0])] = entry[-1]
+        except (OSError, ValueError, TypeError, IndexError, KeyError):
+            pass
+        return cache
+    
+    def flush(self):
+        """Wait until the result cache is on disk"""
+        if self._cache_writer is not None:
+            self._cache_writer.flush()
+    
+    def _save_result_cache(self):
+        """Persist the result cache in the background"""
+        if self._cache_writer is None:
+            os.makedirs(os.path.dirname(RESULT_CACHE_FILE), exist_ok=True)
+            self._cache_writer = BackgroundWriter(RESULT_CACHE_FILE, "analysis cache")
+            atexit.register(self.flush)
+        entries = [[key.hex(), analysis] for key, analysis in self._cache.items()]
+        try:
+            self._cache_writer.submit(dumps(entries))
+        except (TypeError, ValueError) as e:
+            print(f"⚠ Could not cache analysis: {e}")
+    
     def _parse_gemini_response(self, response_text: str, elapsed_time: float) -> Dict[str, Any]:
         """Parse Gemini response with multiple fallback strategies"""
         
@@ -112,51 +415,40 @@ class GeminiAnalyzer:
             "analysis_time": elapsed_time
         }
         
-        # Try to extract JSON
-        json_str = None
-        
-        # Strategy 1: Look for JSON block
-        if "```json" in response_text:
-            json_str = response_text.split("```json")[1].split("```")[0].strip()
-        # Strategy 2: Look for curly braces
-        elif "{" in response_text and "}" in response_text:
+        # Strategy 1: response_mime_type is JSON, so the body usually parses as-is
+        data = None
+        try:
+            data = loads(response_text)
+        except json.JSONDecodeError:
+            # Strategy 2: slice from the first "{" to the last "}" (covers ```json fences)
             start = response_text.find("{")
             end = response_text.rfind("}") + 1
-            json_str = response_text[start:end]
-        # Strategy 3: Maybe it's just JSON
-        else:
-            json_str = response_text.strip()
+            if start != -1 and end > start:
+                json_str = response_text[start:end]
+                try:
+                    data = loads(json_str)
+                except json.JSONDecodeError:
+                    print(f"⚠ Failed to parse JSON: {json_str[:50]}...")
         
-        if json_str:
-            try:
-                data = json.loads(json_str)
-                
-                # Map to our expected format
-                analysis = {
-                    "app": data.get("app", "unknown"),
-                    "activity": data.get("activity", "unknown"),
-                    "error_detected": data.get("error_detected", False),
-                    "suggestion": data.get("suggestion", "No suggestion"),
-                    "confidence": data.get("confidence", 0.5),
-                    "mode": "gemini_json",
-                    "analysis_time": elapsed_time
-                }
-                
-                # Clean up app name
-                app = analysis["app"].lower().replace(" ", "_")
-                if "visual" in app and "studio" in app:
-                    analysis["app"] = "visual_studio"
-                elif "vs" in app and "code" in app:
-                    analysis["app"] = "vscode"
-                elif "command" in app or "cmd" in app:
-                    analysis["app"] = "command_prompt"
-                elif "power" in app and "shell" in app:
-                    analysis["app"] = "powershell"
-                
-                return analysis
-                
-            except json.JSONDecodeError:
-                print(f"⚠ Failed to parse JSON: {json_str[:50]}...")
+        if data is not None:
+            # Map to our expected format
+            analysis = {
+                "app": data.get("app", "unknown"),
+                "activity": data.get("activity", "unknown"),
+                "error_detected": data.get("error_detected", False),
+                "suggestion": data.get("suggestion", "No suggestion"),
+                "confidence": data.get("confidence", 0.5),
+                "mode": "gemini_json",
+                "analysis_time": elapsed_time
+            }
+            
+            # Clean up app name
+            app = analysis["app"].translate(_APP_TRANS)
+            match = _APP_NORMALIZE_RE.match(app)
+            if match:
+                analysis["app"] = match.lastgroup
+            
+            return analysis
         
         # If no JSON, try to extract app from text
         app = self._extract_app_from_text(response_text)
@@ -173,56 +465,11 @@ class GeminiAnalyzer:
     
     def _extract_app_from_text(self, text: str) -> str:
         """Extract app from text response"""
-        text_lower = text.lower()
-        
-        app_patterns = {
-            "vscode": ["vscode", "visual studio code", "code editor", "vs code"],
-            "visual_studio": ["visual studio", "visualstudio"],
-            "pycharm": ["pycharm", "jetbrains"],
-            "chrome": ["chrome", "google chrome", "browser"],
-            "firefox": ["firefox", "mozilla"],
-            "edge": ["edge", "microsoft edge"],
-            "terminal": ["terminal", "linux terminal", "mac terminal"],
-            "command_prompt": ["command prompt", "cmd.exe", "cmd window"],
-            "powershell": ["powershell", "ps1", "ps "],
-            "file_explorer": ["file explorer", "windows explorer", "folder"],
-            "notepad": ["notepad", "text editor"],
-            "word": ["word", "microsoft word"],
-            "excel": ["excel", "spreadsheet"],
-            "slack": ["slack"],
-            "discord": ["discord"],
-            "spotify": ["spotify", "music"]
-        }
-        
-        for app, patterns in app_patterns.items():
-            for pattern in patterns:
-                if pattern in text_lower:
-                    return app
-        
-        return "unknown"
+        return _match_label("app", text.lower())
     
     def _extract_activity_from_text(self, text: str) -> str:
         """Extract activity from text response"""
-        text_lower = text.lower()
-        
-        activity_patterns = {
-            "coding": ["coding", "programming", "writing code", "developing"],
-            "debugging": ["debugging", "fixing error", "troubleshooting"],
-            "browsing": ["browsing", "reading", "searching", "web"],
-            "reading": ["reading", "viewing", "looking at"],
-            "writing": ["writing", "typing", "documenting"],
-            "chatting": ["chatting", "messaging", "communicating"],
-            "presenting": ["presenting", "presentation", "slides"],
-            "file_management": ["files", "folders", "organizing", "managing"],
-            "system_admin": ["system", "admin", "configuring", "settings"]
-        }
-        
-        for activity, patterns in activity_patterns.items():
-            for pattern in patterns:
-                if pattern in text_lower:
-                    return activity
-        
-        return "unknown"
+        return _match_label("activity", text.lower())
     
     def _fallback_with_context(self, screenshot_path: str, context: Dict, elapsed: float) -> Dict[str, Any]:
         """Fallback analysis using filename and context"""
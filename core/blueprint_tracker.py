@@ -6,14 +6,185 @@ Phase 1.4: Enhanced tracking with progress calculation
 """
 
 import os
+import sys
 import json
+import functools
+import atexit
 import time
-from datetime import datetime
+import threading
+from collections import Counter
 from dataclasses import dataclass, asdict
 from typing import Dict, List, Optional, Any
 import hashlib
+from types import MappingProxyType
 
-@dataclass
+from core.jsonio import dumps, dumps_line, loads, now_iso
+from core.writer import write_atomic
+
+
+def _read_json(path: str):
+    """Load a JSON file; raises json.JSONDecodeError on bad content"""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+@functools.lru_cache(maxsize=16)
+def _cached_json(path: str, mtime_ns: int):
+    """_read_json memoized on (path, mtime); callers must not mutate the result"""
+    return _read_json(path)
+
+
+def _read_json_cached(path: str):
+    """Parse a rarely-changing file once per modification"""
+    return _cached_json(path, os.stat(path).st_mtime_ns)
+
+
+def _write_json(path: str, data):
+    """Atomically and durably write data as indented JSON (temp file + rename)"""
+    # orjson serializes dataclass instances natively; the stdlib needs asdict
+    write_atomic(path, dumps(data, indent=True, default=asdict))
+
+# History lists kept in the append-only event log instead of mvp_tracker.json
+_LOG_KEYS = ("components", "milestones", "tech_debt")
+
+# A change is written to mvp_tracker.json at most TRACKER_FLUSH_INTERVAL seconds
+# after the previous write; flush() (also run at exit) writes the rest
+TRACKER_FLUSH_INTERVAL = 10.0
+
+
+class _EventLog:
+    """Plain NDJSON append log (one {"kind", "entry"} record per line)"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._fp = open(path, "a+b")
+        self._fp.seek(0)
+        data = self._fp.read()
+        # Logs written by the old memory-mapped version are NUL-padded; cut the padding
+        end = data.find(b"\0")
+        if end != -1:
+            data = data[:end]
+            self._fp.truncate(end)
+        # A crash can leave a partial last line; start the next record on its own line
+        if data and not data.endswith(b"\n"):
+            self._fp.write(b"\n")
+            self._fp.flush()
+        self._data = data
+    
+    def records(self):
+        """Parsed records from the file as opened, once (unparseable lines are skipped)"""
+        data, self._data = self._data, b""
+        for line in data.splitlines():
+            if not line:
+                continue
+            try:
+                yield loads(line)
+            except json.JSONDecodeError:
+                continue
+    
+    def append(self, *records):
+        """Append records in a single write"""
+        self._fp.write(b"".join(dumps_line(r) for r in records))
+        self._fp.flush()
+    
+    def flush(self):
+        if not self._fp.closed:
+            self._fp.flush()
+    
+    def close(self):
+        if not self._fp.closed:
+            self._fp.close()
+
+
+# slots=True (no per-instance __dict__) needs Python 3.10+; older versions keep __dict__
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+# Progress credit for each component status
+_STATUS_WEIGHTS = MappingProxyType({
+    "completed": 1.0,
+    "included": 0.75,
+    "in_progress": 0.5,
+    "planned": 0.25,
+    "postponed": 0.0
+})
+
+# Default blueprint components (from the blueprint doc), shared read-only specs;
+# each tracker builds its own mutable BlueprintComponent list from them
+_DEFAULT_COMPONENTS = (
+    MappingProxyType({
+        "name": "vector_database",
+        "description": "Supabase pgvector for embeddings",
+        "phase": 2,
+        "status": "postponed",
+        "priority": 1,
+        "tech_debt": "JSON file memory",
+        "dependencies": ("supabase_setup",),
+        "estimated_effort": 8
+    }),
+    MappingProxyType({
+        "name": "graph_database",
+        "description": "Neo4j for knowledge graph",
+        "phase": 2,
+        "status": "postponed",
+        "priority": 2,
+        "tech_debt": "Basic text similarity",
+        "dependencies": ("vector_database",),
+        "estimated_effort": 12
+    }),
+    MappingProxyType({
+        "name": "advanced_overlay",
+        "description": "PyQt6 overlay system",
+        "phase": 4,
+        "status": "postponed",
+        "priority": 3,
+        "tech_debt": "Tkinter basic GUI",
+        "dependencies": ("prevention_system",),
+        "estimated_effort": 16
+    }),
+    MappingProxyType({
+        "name": "plugin_system",
+        "description": "Extensible plugin architecture",
+        "phase": 5,
+        "status": "postponed",
+        "priority": 4,
+        "tech_debt": "Hardcoded plugins",
+        "dependencies": ("advanced_overlay",),
+        "estimated_effort": 20
+    }),
+    MappingProxyType({
+        "name": "telemetry",
+        "description": "Event stream analytics",
+        "phase": 1,
+        "status": "included",
+        "priority": 1,
+        "tech_debt": "Basic event stream",
+        "dependencies": (),
+        "estimated_effort": 4
+    }),
+    MappingProxyType({
+        "name": "proactive_engine",
+        "description": "4-level intervention system",
+        "phase": 3,
+        "status": "included",
+        "priority": 2,
+        "tech_debt": "Reactive suggestions only",
+        "dependencies": ("pattern_detection",),
+        "estimated_effort": 24
+    }),
+    MappingProxyType({
+        "name": "cross_domain",
+        "description": "Multi-channel monitoring",
+        "phase": 2,
+        "status": "included",
+        "priority": 1,
+        "tech_debt": "Full screen capture only",
+        "dependencies": ("event_stream",),
+        "estimated_effort": 12
+    })
+)
+
+
+@dataclass(**_SLOTS)
 class BlueprintComponent:
     """Represents a component from the blueprint"""
     name: str
@@ -29,7 +200,7 @@ class BlueprintComponent:
         if self.dependencies is None:
             self.dependencies = []
 
-@dataclass 
+@dataclass(**_SLOTS)
 class MVPTracker:
     """Tracks MVP implementation progress"""
     version: str = "0.1.1"
@@ -49,7 +220,7 @@ class MVPTracker:
         if self.tech_debt_items is None:
             self.tech_debt_items = []
         if not self.start_date:
-            self.start_date = datetime.now().strftime("%Y-%m-%d")
+            self.start_date = time.strftime("%Y-%m-%d")
 
 class BlueprintTracker:
     """Main tracker class"""
@@ -57,6 +228,7 @@ class BlueprintTracker:
     def __init__(self, config_path: str = "config/mvp_config.json"):
         self.config_path = config_path
         self.tracker_file = "mvp_tracker.json"
+        self.events_file = "mvp_tracker_events.ndjson"
         self.blueprint_file = "config/blueprint_components.json"
         
         # Load configuration
@@ -64,9 +236,12 @@ class BlueprintTracker:
         
         # Initialize tracker data
         self.tracker_data = self._load_or_create_tracker()
+        self._log = self._open_event_log()
         
-        # Blueprint components
-        self.components = self._load_blueprint_components()
+        # Blueprint components: raw specs until something needs the objects
+        self._components_raw = self._load_blueprint_components()
+        self._components = None
+        self._recount()
         
         # Current MVP state
         self.mvp_state = MVPTracker()
@@ -75,11 +250,17 @@ class BlueprintTracker:
         if 'overall_progress' not in self.tracker_data:
             self.tracker_data['overall_progress'] = 0
         
+        # Mutations only touch tracker_data; the file is rewritten at most
+        # every TRACKER_FLUSH_INTERVAL seconds and on flush()
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        atexit.register(self.close)
+        
     def _load_config(self) -> Dict:
         """Load MVP configuration"""
         try:
-            with open(self.config_path, 'r') as f:
-                return json.load(f)
+            # Shallow copy: the parsed dict is shared through the cache
+            return dict(_read_json_cached(self.config_path))
         except FileNotFoundError:
             return {"mode": "MVP", "version": "0.1.1"}
     
@@ -87,22 +268,22 @@ class BlueprintTracker:
         """Load existing tracker or create new one"""
         if os.path.exists(self.tracker_file):
             try:
-                with open(self.tracker_file, 'r') as f:
-                    data = json.load(f)
-                    # Ensure all required keys exist
-                    required_keys = ['overall_progress', 'current_phase', 'components', 'milestones']
-                    for key in required_keys:
-                        if key not in data:
-                            data[key] = 0 if key == 'overall_progress' else [] if key in ['components', 'milestones'] else 'Phase 1'
-                    return data
+                data = _read_json(self.tracker_file)
+                # Ensure all required keys exist
+                required_keys = ['overall_progress', 'current_phase', 'components', 'milestones']
+                for key in required_keys:
+                    if key not in data:
+                        data[key] = 0 if key == 'overall_progress' else [] if key in ['components', 'milestones'] else 'Phase 1'
+                return data
             except json.JSONDecodeError:
                 print("⚠ Tracker file corrupted, creating new one")
         
         # Create new tracker
+        now = now_iso()
         return {
             "version": "0.1.1",
-            "created": datetime.now().isoformat(),
-            "last_updated": datetime.now().isoformat(),
+            "created": now,
+            "last_updated": now,
             "overall_progress": 0,
             "current_phase": "Phase 1",
             "components": [],
@@ -110,94 +291,82 @@ class BlueprintTracker:
             "tech_debt": []
         }
     
-    def _load_blueprint_components(self) -> List[BlueprintComponent]:
-        """Load blueprint components from file or create defaults"""
+    def _open_event_log(self) -> Optional[_EventLog]:
+        """Open the history log and merge it into tracker_data"""
+        try:
+            log = _EventLog(self.events_file)
+        except OSError as e:
+            # History simply stays inline in mvp_tracker.json
+            print(f"⚠ Tracker event log unavailable: {e}")
+            return None
+        
+        records = list(log.records())
+        migrated = any(r.get("kind") == "migrated" for r in records)
+        
+        # Older tracker files keep history inline; move it into the log once.
+        # The entries and the "migrated" marker go in one write, so a failed
+        # _save_tracker below leaves the inline copy to be dropped, not re-appended
+        inline = {key: self.tracker_data.get(key) or [] for key in _LOG_KEYS}
+        if any(inline.values()) and not migrated:
+            moved = [{"kind": key, "entry": entry} for key in _LOG_KEYS for entry in inline[key]]
+            moved.append({"kind": "migrated", "created": self.tracker_data.get("created")})
+            log.append(*moved)
+            records.extend(moved)
+        
+        history = {key: [] for key in _LOG_KEYS}
+        for record in records:
+            if record.get("kind") in history:
+                history[record["kind"]].append(record.get("entry"))
+        self.tracker_data.update(history)
+        
+        if any(inline.values()):
+            # Rewrite the summary file without the migrated lists
+            self._log = log
+            self._save_tracker()
+        return log
+    
+    def _log_event(self, kind: str, entry: Dict):
+        """Add a history entry in memory and to the append log"""
+        self.tracker_data.setdefault(kind, []).append(entry)
+        if self._log is not None:
+            try:
+                self._log.append({"kind": kind, "entry": entry})
+            except (OSError, ValueError) as e:
+                print(f"⚠ Failed to log tracker event: {e}")
+    
+    def _load_blueprint_components(self) -> List[Dict]:
+        """Load blueprint component specs from file or use the defaults (read-only)"""
         if os.path.exists(self.blueprint_file):
             try:
-                with open(self.blueprint_file, 'r') as f:
-                    components_data = json.load(f)
-                    return [BlueprintComponent(**comp) for comp in components_data]
+                return _read_json_cached(self.blueprint_file)
             except (json.JSONDecodeError, FileNotFoundError):
                 pass
         
         # Default blueprint components (from the blueprint doc)
-        return [
-            BlueprintComponent(
-                name="vector_database",
-                description="Supabase pgvector for embeddings",
-                phase=2,
-                status="postponed",
-                priority=1,
-                tech_debt="JSON file memory",
-                dependencies=["supabase_setup"],
-                estimated_effort=8
-            ),
-            BlueprintComponent(
-                name="graph_database",
-                description="Neo4j for knowledge graph",
-                phase=2,
-                status="postponed", 
-                priority=2,
-                tech_debt="Basic text similarity",
-                dependencies=["vector_database"],
-                estimated_effort=12
-            ),
-            BlueprintComponent(
-                name="advanced_overlay",
-                description="PyQt6 overlay system",
-                phase=4,
-                status="postponed",
-                priority=3,
-                tech_debt="Tkinter basic GUI",
-                dependencies=["prevention_system"],
-                estimated_effort=16
-            ),
-            BlueprintComponent(
-                name="plugin_system",
-                description="Extensible plugin architecture",
-                phase=5,
-                status="postponed",
-                priority=4,
-                tech_debt="Hardcoded plugins",
-                dependencies=["advanced_overlay"],
-                estimated_effort=20
-            ),
-            BlueprintComponent(
-                name="telemetry",
-                description="Event stream analytics",
-                phase=1,
-                status="included",
-                priority=1,
-                tech_debt="Basic event stream",
-                dependencies=[],
-                estimated_effort=4
-            ),
-            BlueprintComponent(
-                name="proactive_engine",
-                description="4-level intervention system",
-                phase=3,
-                status="included",
-                priority=2,
-                tech_debt="Reactive suggestions only",
-                dependencies=["pattern_detection"],
-                estimated_effort=24
-            ),
-            BlueprintComponent(
-                name="cross_domain",
-                description="Multi-channel monitoring",
-                phase=2,
-                status="included",
-                priority=1,
-                tech_debt="Full screen capture only",
-                dependencies=["event_stream"],
-                estimated_effort=12
-            )
-        ]
+        return _DEFAULT_COMPONENTS
+    
+    @property
+    def components(self) -> List[BlueprintComponent]:
+        """Blueprint components, built from the raw specs on first access"""
+        if self._components is None:
+            # Copy dependencies so shared spec data is never mutated through a component
+            self._components = [
+                BlueprintComponent(**{**spec, "dependencies": list(spec.get("dependencies") or [])})
+                for spec in self._components_raw
+            ]
+            # Built in reverse so a duplicated name resolves to its first entry, as before
+            self._by_name = {c.name: c for c in reversed(self._components)}
+            # Phase and priority never change after load, so sort orders are fixed here
+            self._by_rank = sorted(self._components, key=lambda x: (x.priority, x.phase))
+            self._by_phase = {}
+            for c in sorted(self._components, key=lambda x: x.priority):
+                self._by_phase.setdefault(c.phase, []).append(c)
+        return self._components
     
     def update_progress(self, component_name: str, status: str, notes: str = ""):
         """Update progress for a specific component"""
         # Find the component
-        component = next((c for c in self.components if c.name == component_name), None)
+        component = self.get_component(component_name)
         if not component:
             print(f"⚠ Component {component_name} not found in blueprint")
             return
@@ -205,85 +374,96 @@ class BlueprintTracker:
         # Update component status
         old_status = component.status
         component.status = status
+        self._status_counts[old_status] -= 1
+        self._status_counts[status] += 1
+        self._weighted_score += (6 - component.priority) * (
+            _STATUS_WEIGHTS.get(status, 0) - _STATUS_WEIGHTS.get(old_status, 0)
+        )
+        self._pending = None
         
         # Add to tracker
+        now = now_iso()
         update = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now,
             "component": component_name,
             "old_status": old_status,
             "new_status": status,
             "notes": notes
         }
         
-        self.tracker_data["components"].append(update)
+        self._log_event("components", update)
         
         # Recalculate overall progress
         self._calculate_overall_progress()
         
-        # Save
-        self._save_tracker()
+        self._mark_dirty(now)
         
         print(f"✓ Progress updated: {component_name} -> {status}")
     
+    def _recount(self):
+        """Build cached per-status counts from the raw specs (components are only read at init)"""
+        specs = self._components_raw
+        self._status_counts = Counter(spec["status"] for spec in specs)
+        self._pending = None
+        
+        # Weight components by priority (higher priority = higher weight)
+        self._total_weight = sum(6 - spec["priority"] for spec in specs)
+        self._weighted_score = sum(
+            (6 - spec["priority"]) * _STATUS_WEIGHTS.get(spec["status"], 0) for spec in specs
+        )
+    
+    def _pending_components(self) -> List[BlueprintComponent]:
+        """Postponed/planned components by (priority, phase), cached until a status changes"""
+        if self._pending is None:
+            self.components  # builds _by_rank
+            # Filtering the presorted list keeps the order without re-sorting
+            self._pending = [c for c in self._by_rank if c.status in ("postponed", "planned")]
+        return self._pending
+    
     def _calculate_overall_progress(self):
         """Calculate overall progress percentage"""
-        total_components = len(self.components)
+        total_components = len(self._components_raw)
         if total_components == 0:
             self.tracker_data['overall_progress'] = 0
             return
         
-        # Weight components by priority
-        completed_score = 0
-        total_score = 0
-        
-        status_weights = {
-            "completed": 1.0,
-            "included": 0.75,
-            "in_progress": 0.5,
-            "planned": 0.25,
-            "postponed": 0.0
-        }
-        
-        for component in self.components:
-            weight = 6 - component.priority  # Higher priority = higher weight
-            status_weight = status_weights.get(component.status, 0)
-            completed_score += weight * status_weight
-            total_score += weight
-        
-        if total_score > 0:
-            progress = int((completed_score / total_score) * 100)
+        # Weighted sums are kept current by _recount/update_progress
+        if self._total_weight > 0:
+            progress = int((self._weighted_score / self._total_weight) * 100)
             self.tracker_data['overall_progress'] = progress
     
     def log_tech_debt(self, component: str, debt: str):
         """Log technical debt for a component"""
+        now = now_iso()
         debt_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now,
             "component": component,
             "debt": debt,
             "status": "pending"
         }
         
-        self.tracker_data.setdefault("tech_debt", []).append(debt_entry)
+        self._log_event("tech_debt", debt_entry)
         
         # Also update component
-        comp = next((c for c in self.components if c.name == component), None)
+        comp = self.get_component(component)
         if comp:
             comp.tech_debt = debt
         
-        self._save_tracker()
+        self._mark_dirty(now)
         
         print(f"⚠ Tech debt logged: {debt}")
     
     def log_milestone(self, milestone: str, details: str = ""):
         """Log a development milestone"""
+        now = now_iso()
         milestone_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now,
             "milestone": milestone,
             "details": details
         }
         
-        self.tracker_data.setdefault("milestones", []).append(milestone_entry)
-        self._save_tracker()
+        self._log_event("milestones", milestone_entry)
+        self._mark_dirty(now)
         
         print(f"🎯 Milestone: {milestone}")
     
@@ -294,67 +474,74 @@ class BlueprintTracker:
                 setattr(self.mvp_state, key, value)
         
         # Update tracker
-        self.tracker_data["last_updated"] = datetime.now().isoformat()
-        self.tracker_data["mvp_stats"] = asdict(self.mvp_state)
-        self._save_tracker()
+        # Stored as the dataclass itself; converted to JSON only when flushed
+        self.tracker_data["mvp_stats"] = self.mvp_state
+        self._mark_dirty()
     
     def show_status(self):
         """Display current MVP vs Blueprint status"""
-        print("\n" + "=" * 60)
-        print("MVP vs BLUEPRINT TRACKER")
-        print("=" * 60)
+        # Make sure the file on disk matches what is shown
+        self.flush()
+        
+        lines = []
+        lines.append("\n" + "=" * 60)
+        lines.append("MVP vs BLUEPRINT TRACKER")
+        lines.append("=" * 60)
         
         # Get tracker data safely with defaults
         tracker = self.tracker_data
         progress = tracker.get('overall_progress', 0)
         phase = tracker.get('current_phase', 'Phase 1')
         
-        print(f"Phase: {phase}")
-        print(f"Overall Progress: {progress}%")
-        print(f"Last Updated: {tracker.get('last_updated', 'N/A')}")
+        lines.append(f"Phase: {phase}")
+        lines.append(f"Overall Progress: {progress}%")
+        lines.append(f"Last Updated: {tracker.get('last_updated', 'N/A')}")
         
         # MVP Stats
-        print("\n📊 MVP STATISTICS:")
+        lines.append("\n📊 MVP STATISTICS:")
         if 'mvp_stats' in tracker:
             stats = tracker['mvp_stats']
-            print(f"  • Version: {stats.get('version', 'N/A')}")
-            print(f"  • Captures: {stats.get('total_captures', 0)}")
-            print(f"  • Memory Items: {stats.get('memory_items', 0)}")
-            print(f"  • Suggestions: {stats.get('suggestions_given', 0)}")
+            if not isinstance(stats, dict):
+                stats = asdict(stats)
+            lines.append(f"  • Version: {stats.get('version', 'N/A')}")
+            lines.append(f"  • Captures: {stats.get('total_captures', 0)}")
+            lines.append(f"  • Memory Items: {stats.get('memory_items', 0)}")
+            lines.append(f"  • Suggestions: {stats.get('suggestions_given', 0)}")
         
         # Component Status
-        print("\n🔧 COMPONENT STATUS:")
+        lines.append("\n🔧 COMPONENT STATUS:")
         for component in self.components:
             status_icon = "🟢" if component.status in ["included", "completed"] else "🟡" if component.status == "in_progress" else "🔴"
-            print(f"  {status_icon} {component.name:20} {component.status:12} (Phase {component.phase})")
+            lines.append(f"  {status_icon} {component.name:20} {component.status:12} (Phase {component.phase})")
         
         # Recent Tech Debt
         tech_debt = tracker.get('tech_debt', [])
         if tech_debt and len(tech_debt) > 0:
-            print("\n⚠ RECENT TECH DEBT:")
+            lines.append("\n⚠ RECENT TECH DEBT:")
             for debt in tech_debt[-3:]:  # Show last 3
-                print(f"  • {debt.get('component', 'unknown')}: {debt.get('debt', 'N/A')}")
+                lines.append(f"  • {debt.get('component', 'unknown')}: {debt.get('debt', 'N/A')}")
         
         # Migration Path
-        print("\n🛣️  MIGRATION PATH (Next 3 items):")
-        next_items = sorted(
-            [c for c in self.components if c.status in ["postponed", "planned"]],
-            key=lambda x: (x.priority, x.phase)
-        )[:3]
+        lines.append("\n🛣️  MIGRATION PATH (Next 3 items):")
+        next_items = self._pending_components()[:3]
         
         for i, item in enumerate(next_items, 1):
-            print(f"  {i}. {item.name}: {item.description}")
-            print(f"     Phase {item.phase}, Priority {item.priority}, Effort: {item.estimated_effort}h")
+            lines.append(f"  {i}. {item.name}: {item.description}")
+            lines.append(f"     Phase {item.phase}, Priority {item.priority}, Effort: {item.estimated_effort}h")
         
-        print("=" * 60)
+        lines.append("=" * 60)
+        
+        # One write instead of a print() (and possible flush) per line
+        sys.stdout.write("\n".join(lines) + "\n")
     
     def get_migration_path(self) -> List[Dict]:
         """Get the migration path from MVP to full blueprint"""
         path = []
         
         # Group by phase
+        self.components  # builds _by_phase
         for phase in range(1, 6):
-            phase_components = [c for c in self.components if c.phase == phase]
+            phase_components = self._by_phase.get(phase)
             if phase_components:
                 path.append({
                     "phase": f"Phase {phase}",
@@ -366,7 +553,7 @@ class BlueprintTracker:
                             "dependencies": c.dependencies,
                             "effort": c.estimated_effort
                         }
-                        for c in sorted(phase_components, key=lambda x: x.priority)
+                        for c in phase_components
                     ]
                 })
         
@@ -380,18 +567,15 @@ class BlueprintTracker:
         report.append("=" * 60)
         
         # Summary
-        report.append(f"\n📅 Report Generated: {datetime.now().isoformat()}")
+        report.append(f"\n📅 Report Generated: {now_iso()}")
         report.append(f"📈 Overall Progress: {self.tracker_data.get('overall_progress', 0)}%")
         report.append(f"🎯 Current Phase: {self.tracker_data.get('current_phase', 'Phase 1')}")
         
         # Component Breakdown
         report.append("\n🔧 COMPONENT BREAKDOWN:")
-        status_counts = {}
-        for component in self.components:
-            status_counts[component.status] = status_counts.get(component.status, 0) + 1
-        
-        for status, count in status_counts.items():
-            report.append(f"  {status}: {count}")
+        for status, count in self._status_counts.items():
+            if count > 0:
+                report.append(f"  {status}: {count}")
         
         # Tech Debt Summary
         tech_debt = self.tracker_data.get('tech_debt', [])
@@ -413,23 +597,49 @@ class BlueprintTracker:
         
         return "\n".join(report)
     
+    def _mark_dirty(self, now: Optional[str] = None):
+        """Record an in-memory change; written once TRACKER_FLUSH_INTERVAL has passed"""
+        self.tracker_data["last_updated"] = now or now_iso()
+        self._dirty = True
+        if time.monotonic() - self._last_flush > TRACKER_FLUSH_INTERVAL:
+            # Bounds what a crash can lose without a write per capture
+            self._save_tracker()
+    
+    def flush(self):
+        """Write tracker data to file if anything changed since the last write"""
+        if self._log is not None:
+            self._log.flush()
+        if self._dirty:
+            self._save_tracker()
+    
+    def close(self):
+        """Flush and release the event log"""
+        self.flush()
+        if self._log is not None:
+            self._log.close()
+    
     def _save_tracker(self):
         """Save tracker data to file"""
-        self.tracker_data["last_updated"] = datetime.now().isoformat()
-        
         # Ensure overall_progress exists before saving
         if 'overall_progress' not in self.tracker_data:
             self.tracker_data['overall_progress'] = 0
         
+        # History lists live in the event log; only the summary is rewritten
+        data = self.tracker_data
+        if self._log is not None:
+            data = {k: v for k, v in data.items() if k not in _LOG_KEYS}
+        
         try:
-            with open(self.tracker_file, 'w') as f:
-                json.dump(self.tracker_data, f, indent=2)
+            _write_json(self.tracker_file, data)
+            self._dirty = False
+            self._last_flush = time.monotonic()
         except Exception as e:
             print(f"⚠ Failed to save tracker: {e}")
     
     def get_component(self, name: str) -> Optional[BlueprintComponent]:
         """Get a component by name"""
-        return next((c for c in self.components if c.name == name), None)
+        self.components  # builds _by_name
+        return self._by_name.get(name)
     
     def mark_completed(self, component_name: str):
         """Mark a component as completed"""
@@ -437,12 +647,16 @@ class BlueprintTracker:
 
 # Singleton instance for easy access
 _tracker_instance = None
+_tracker_lock = threading.Lock()
 
 def get_tracker(config_path: str = "config/mvp_config.json") -> BlueprintTracker:
-    """Get or create tracker instance"""
+    """Get or create tracker instance (thread-safe)"""
     global _tracker_instance
+    # Lock-free once created; the lock only guards first construction
     if _tracker_instance is None:
-        _tracker_instance = BlueprintTracker(config_path)
+        with _tracker_lock:
+            if _tracker_instance is None:
+                _tracker_instance = BlueprintTracker(config_path)
     return _tracker_instance
 
 if __name__ == "__main__":
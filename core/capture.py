@@ -6,12 +6,32 @@ Phase 1.4: Enhanced with window context
 """
 
 import os
-import json
 import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from io import BytesIO
 from PIL import ImageGrab
 import pyautogui
 
+from core.jsonio import dumps
+
+# Optional active-window info (pip install pygetwindow), imported once
+try:
+    import pygetwindow as _gw
+except ImportError:
+    _gw = None
+
+
+def _drop_alpha(screenshot):
+    """RGB copy of a grab; screens have no transparency, so alpha is dead weight"""
+    # macOS grabs come back RGBA; 3 bytes/pixel is 25% less to encode, hash and resize
+    if screenshot.mode != "RGB":
+        return screenshot.convert("RGB")
+    return screenshot
+
+
 class MVPCapture:
     """MVP Screen Capture with window context"""
     
@@ -19,35 +39,108 @@ class MVPCapture:
         self.screenshot_dir = screenshot_dir
         os.makedirs(screenshot_dir, exist_ok=True)
         
+        # Appended on the I/O thread, read by get_screenshot_stats: both under _index_lock
+        self._index, self._index_bytes = self._scan_screenshots()
+        self._index_lock = threading.Lock()
+        
+        # PNG encode + write happen on one background thread; _pending maps
+        # filepath -> Future until a caller waits for it (see wait_for)
+        self._io_pool = ThreadPoolExecutor(max_workers=1)
+        self._pending = {}
+        self._warned_no_gw = False
+        
+    def _write_png(self, screenshot, filepath):
+        """Encode and write one screenshot (runs on the I/O thread)"""
+        try:
+            buf = BytesIO()
+            # compress_level=1 is several times faster than the default 6
+            screenshot.save(buf, "PNG", compress_level=1)
+            with open(filepath, 'wb') as f:
+                f.write(buf.getbuffer())
+            self._index_add(filepath, buf.getbuffer().nbytes)
+            return True
+        except Exception as e:
+            print(f"⚠ Failed to save screenshot {filepath}: {e}")
+            return False
+    
+    def _scan_screenshots(self):
+        """Index existing PNGs once: deque of (mtime, name, path, size), oldest first"""
+        entries = []
+        total_size = 0
+        # scandir caches each entry's stat, so one syscall per file
+        with os.scandir(self.screenshot_dir) as it:
+            for entry in it:
+                if entry.name.endswith('.png'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name, entry.path, stat.st_size))
+                    total_size += stat.st_size
+        entries.sort()
+        return deque(entries), total_size
+    
+    def _index_add(self, filepath, size):
+        """Record a written screenshot (I/O thread)"""
+        with self._index_lock:
+            self._index.append((time.time(), os.path.basename(filepath), filepath, size))
+            self._index_bytes += size
+    
+    def _save_async(self, screenshot, filepath):
+        """Queue a screenshot for writing and return immediately"""
+        # Forget finished writes nobody waited for
+        for path in [p for p, f in self._pending.items() if f.done()]:
+            del self._pending[path]
+        self._pending[filepath] = self._io_pool.submit(self._write_png, screenshot, filepath)
+    
+    def wait_for(self, filepath, timeout=None):
+        """Block until a captured screenshot is on disk; False if it could not be written"""
+        future = self._pending.pop(filepath, None)
+        if future is None:
+            return os.path.exists(filepath)
+        return future.result(timeout)
+    
+    def flush(self):
+        """Wait for every queued screenshot write"""
+        for path in list(self._pending):
+            self.wait_for(path)
+    
     def capture(self, filename_prefix="mvp"):
         """Capture screenshot - basic method"""
+        return self.capture_frame(filename_prefix)[0]
+    
+    def capture_frame(self, filename_prefix="mvp"):
+        """Capture a screenshot and return (filepath, PIL image), or (None, None)
+        
+        The PNG is written in the background; callers that only need the pixels
+        (e.g. analyzer.analyze(path, image=frame)) can use the image right away.
+        """
+        # Nanosecond stamp: unique even for back-to-back captures (no overwrites),
+        # shared with the fallback path. Human-readable time lives in the context JSON.
+        timestamp = time.time_ns()
+        
         try:
             # Take screenshot using ImageGrab (faster)
-            screenshot = ImageGrab.grab()
+            screenshot = _drop_alpha(ImageGrab.grab())
             
             # Generate filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"{filename_prefix}_{timestamp}.png"
             filepath = os.path.join(self.screenshot_dir, filename)
             
-            # Save screenshot
-            screenshot.save(filepath)
+            # Save screenshot (in the background; see wait_for)
+            self._save_async(screenshot, filepath)
             
-            return filepath
+            return filepath, screenshot
             
         except Exception as e:
             print(f"⚠ Capture error (ImageGrab): {e}")
             # Fallback to pyautogui
             try:
-                screenshot = pyautogui.screenshot()
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                screenshot = _drop_alpha(pyautogui.screenshot())
                 filename = f"{filename_prefix}_{timestamp}_fallback.png"
                 filepath = os.path.join(self.screenshot_dir, filename)
-                screenshot.save(filepath)
-                return filepath
+                self._save_async(screenshot, filepath)
+                return filepath, screenshot
             except Exception as e2:
                 print(f"❌ Fallback capture also failed: {e2}")
-                return None
+                return None, None
     
     def capture_with_context(self, filename_prefix="mvp"):
         """Capture screenshot with window context information"""
@@ -69,23 +162,32 @@ class MVPCapture:
             }
             
             try:
-                with open(context_file, 'w') as f:
-                    json.dump(context_data, f, indent=2)
+                with open(context_file, 'wb') as f:
+                    f.write(dumps(context_data, indent=True))
             except Exception as e:
                 print(f"⚠ Failed to save context: {e}")
         
         return screenshot_path, context
     
+    def window_context(self):
+        """Active window context (window_title, geometry), or None"""
+        return self._get_window_context()
+    
     def _get_window_context(self):
         """Get active window context if available"""
         context = {}
         
+        if _gw is None:
+            # Say it once, not on every capture
+            if not self._warned_no_gw:
+                print("  ⚠ pygetwindow not installed, window context unavailable")
+                print("  💡 Run: pip install pygetwindow")
+                self._warned_no_gw = True
+            return None
+        
         try:
-            # Try to import pygetwindow
-            import pygetwindow as gw
-            
             # Get active window
-            active_window = gw.getActiveWindow()
+            active_window = _gw.getActiveWindow()
             
             if active_window:
                 context = {
@@ -109,9 +211,6 @@ class MVPCapture:
                     
                     print(f"  📊 Window: {context['window_short_title'][:30]}...")
                 
-        except ImportError:
-            print("  ⚠ pygetwindow not installed, window context unavailable")
-            print("  💡 Run: pip install pygetwindow")
         except Exception as e:
             print(f"  ⚠ Window context error: {e}")
         
@@ -119,12 +218,13 @@ class MVPCapture:
     
     def capture_active_window(self, filename_prefix="window"):
         """Capture only the active window (more precise)"""
+        if _gw is None:
+            print("  ⚠ pygetwindow not installed, falling back to full screen")
+            return self.capture(filename_prefix), None
+        
         try:
             # Try to capture specific window
-            import pygetwindow as gw
-            import pyautogui
-            
-            active_window = gw.getActiveWindow()
+            active_window = _gw.getActiveWindow()
             
             if not active_window:
                 print("  ⚠ No active window found, using full screen")
@@ -137,16 +237,16 @@ class MVPCapture:
             height = active_window.height
             
             # Capture window region
-            screenshot = pyautogui.screenshot(region=(left, top, width, height))
+            screenshot = _drop_alpha(pyautogui.screenshot(region=(left, top, width, height)))
             
             # Generate filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            timestamp = time.time_ns()
             window_name = "".join(c for c in active_window.title[:20] if c.isalnum() or c in (' ', '-', '_'))
             filename = f"{filename_prefix}_{window_name}_{timestamp}.png"
             filepath = os.path.join(self.screenshot_dir, filename)
             
-            # Save screenshot
-            screenshot.save(filepath)
+            # Save screenshot (in the background; see wait_for)
+            self._save_async(screenshot, filepath)
             
             # Create context
             context = {
@@ -162,9 +262,6 @@ class MVPCapture:
             
             return filepath, context
             
-        except ImportError:
-            print("  ⚠ pygetwindow not installed, falling back to full screen")
-            return self.capture(filename_prefix), None
         except Exception as e:
             print(f"  ⚠ Active window capture failed: {e}")
             return self.capture(filename_prefix), None
@@ -192,33 +289,26 @@ class MVPCapture:
     
     def get_screenshot_stats(self):
         """Get statistics about saved screenshots"""
-        if not os.path.exists(self.screenshot_dir):
-            return {"total": 0, "latest": None, "size_mb": 0}
+        # Served from the in-memory index (scanned at startup, appended on
+        # every write), so the directory is not listed again
+        with self._index_lock:
+            index = list(self._index)
+            index_bytes = self._index_bytes
         
-        screenshots = []
-        total_size = 0
-        
-        for filename in os.listdir(self.screenshot_dir):
-            if filename.endswith('.png'):
-                filepath = os.path.join(self.screenshot_dir, filename)
-                file_size = os.path.getsize(filepath)
-                modified_time = os.path.getmtime(filepath)
-                
-                screenshots.append({
-                    "filename": filename,
-                    "path": filepath,
-                    "size_bytes": file_size,
-                    "modified": datetime.fromtimestamp(modified_time).isoformat()
-                })
-                
-                total_size += file_size
-        
-        # Sort by modification time (newest first)
-        screenshots.sort(key=lambda x: x["modified"], reverse=True)
+        # Only the latest 5 are reported (newest first)
+        screenshots = [
+            {
+                "filename": name,
+                "path": path,
+                "size_bytes": size,
+                "modified": datetime.fromtimestamp(mtime).isoformat()
+            }
+            for mtime, name, path, size in reversed(index[-5:])
+        ]
         
         return {
-            "total": len(screenshots),
+            "total": len(index),
             "latest": screenshots[0]["filename"] if screenshots else None,
-            "size_mb": total_size / (1024 * 1024),
-            "screenshots": screenshots[:5]  # Latest 5
-        }
\ No newline at end of file
+            "size_mb": index_bytes / (1024 * 1024),
+            "screenshots": screenshots  # Latest 5
+        }
@@ -4,11 +4,13 @@ config.py
 MVP Configuration
 """
 
-import json
 import os
 from dataclasses import dataclass, field
 from typing import List
 
+from core.jsonio import dumps, loads
+from core.writer import write_atomic
+
 # Load environment variables from .env file
 try:
     from dotenv import load_dotenv
@@ -51,8 +53,8 @@ class MVPConfig:
     def _load_from_file(self):
         """Load configuration from file"""
         try:
-            with open(self.config_path, 'r') as f:
-                data = json.load(f)
+            with open(self.config_path, 'rb') as f:
+                data = loads(f.read())
                 self.mode = data.get("mode", self.mode)
                 self.version = data.get("version", self.version)
                 self.capture_interval = data.get("capture_interval", self.capture_interval)
@@ -77,6 +79,8 @@ class MVPConfig:
             "plugins": self.plugins,
             "gemini_model": self.gemini_model
         }
-        with open(self.config_path, 'w') as f:
-            json.dump(default_config, f, indent=2)
+        data = dumps(default_config, indent=True)
+        
+        # Temp file + rename: a crash never leaves a half-written config behind
+        write_atomic(self.config_path, data)
         print(f"✓ Created default config at {self.config_path}")
\ No newline at end of file
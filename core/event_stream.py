@@ -7,8 +7,16 @@ Phase 1.4: Basic event logging
 
 import os
 import json
-from datetime import datetime
-from typing import List, Dict, Any
+import atexit
+import itertools
+from collections import deque
+from typing import Deque, List, Dict, Any
+
+from core.jsonio import dumps, dumps_line, loads, now_iso
+from core.writer import write_atomic
+
+# Ring buffer size: the oldest events fall off automatically once full
+MAX_EVENTS = 1000
 
 class EventStream:
     """Event Stream for tracking user activity"""
@@ -16,15 +24,26 @@ class EventStream:
     def __init__(self, event_file="memory/event_stream.json"):
         self.event_file = event_file
         self.phase = "Phase 1.4"
+        # Each event is appended here as one JSON line; save_events folds the
+        # log into event_file and empties it
+        self.event_log = os.path.splitext(event_file)[0] + ".jsonl"
         os.makedirs(os.path.dirname(event_file), exist_ok=True)
-        self.events = self._load_events()
+        self.events: Deque[Dict] = deque(self._load_events(), maxlen=MAX_EVENTS)
+        logged = self._load_event_log()
+        self.events.extend(logged)
+        self._log_fp = self._open_event_log()
+        
+        # save_events only rewrites event_file after a change (or a log left by a crash);
+        # pending events are saved at exit
+        self._dirty = bool(logged)
+        atexit.register(self.flush)
     
     def _load_events(self) -> List[Dict]:
         """Load events from file - ensure it's always a list"""
         if os.path.exists(self.event_file):
             try:
-                with open(self.event_file, 'r') as f:
-                    data = json.load(f)
+                with open(self.event_file, 'rb') as f:
+                    data = loads(f.read())
                     # Ensure we always return a list
                     if isinstance(data, list):
                         return data
@@ -38,52 +57,98 @@ class EventStream:
         
         return []  # Always return a list
     
+    def _load_event_log(self) -> List[Dict]:
+        """Events appended since event_file was last written"""
+        events = []
+        try:
+            with open(self.event_log, 'rb') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        events.append(loads(line))
+                    except json.JSONDecodeError:
+                        continue  # e.g. a line cut short by a crash
+        except FileNotFoundError:
+            pass
+        return events
+    
+    def _open_event_log(self):
+        """Open the event log for appending (None: events are only saved by save_events)"""
+        try:
+            # Unbuffered: one write() per event, nothing is ever rewritten
+            # (readable too, for the partial-line check below)
+            fp = open(self.event_log, 'a+b', buffering=0)
+        except OSError as e:
+            print(f"⚠ Event log unavailable: {e}")
+            return None
+        if fp.seek(0, os.SEEK_END):
+            # Terminate a line cut short by a crash so the next record starts clean
+            fp.seek(-1, os.SEEK_END)
+            if fp.read(1) != b"\n":
+                fp.write(b"\n")  # append mode: lands at the end regardless
+        return fp
+    
     def add_event(self, event_type: str, data: Dict = None):
         """Add an event to the stream"""
         event = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now_iso(),
             "type": event_type,
             "data": data or {},
             "phase": self.phase
         }
         
-        # Ensure self.events is a list
-        if not isinstance(self.events, list):
-            print("⚠ Events was not a list, resetting")
-            self.events = []
-        
+        # O(1); the deque drops the oldest event past MAX_EVENTS
         self.events.append(event)
-        
-        # Keep only last 1000 events
-        if len(self.events) > 1000:
-            self.events = self.events[-1000:]
+        self._dirty = True
+        if self._log_fp is not None:
+            try:
+                # O(1): only the new event is written
+                self._log_fp.write(dumps_line(event))
+            except (OSError, ValueError) as e:
+                print(f"⚠ Failed to log event: {e}")
     
     def save_events(self):
-        """Save events to file"""
+        """Compact the event log into the events file (skipped when nothing changed)"""
+        if not self._dirty:
+            return
         try:
-            # Always save as a list
-            with open(self.event_file, 'w') as f:
-                json.dump(self.events, f, indent=2)
+            # Always save as a list; synced before the log is emptied, so every
+            # event is on disk in one file or the other
+            write_atomic(self.event_file, dumps(list(self.events)))
+            if self._log_fp is not None:
+                self._log_fp.truncate(0)
+            self._dirty = False
         except Exception as e:
             print(f"⚠ Failed to save events: {e}")
     
+    def flush(self):
+        """Save pending events (run at exit)"""
+        self.save_events()
+    
     def analyze_patterns(self, window_size: int = 10) -> List[str]:
         """Analyze patterns in recent events"""
-        if not isinstance(self.events, list) or len(self.events) < window_size:
+        if len(self.events) < window_size:
             return []
         
-        recent_events = self.events[-window_size:]
+        recent_events = list(itertools.islice(self.events, len(self.events) - window_size, None))
         
         patterns = []
         
+        # One pass counts both error events and events mentioning vscode
+        debug_count = coding_count = 0
+        for e in recent_events:
+            if e.get("type") == "error":
+                debug_count += 1
+            if "vscode" in str(e.get("data", {})):
+                coding_count += 1
+        
         # Check for debugging session
-        debug_events = [e for e in recent_events if e.get("type") == "error"]
-        if len(debug_events) > 3:
+        if debug_count > 3:
             patterns.append("debugging_session")
         
         # Check for coding session
-        coding_events = [e for e in recent_events if "vscode" in str(e.get("data", {}))]
-        if len(coding_events) > 5:
+        if coding_count > 5:
             patterns.append("coding_session")
         
         # Check for working session
@@ -94,6 +159,4 @@ class EventStream:
     
     def get_recent_activity(self, limit: int = 10) -> List[Dict]:
         """Get recent activity"""
-        if not isinstance(self.events, list):
-            return []
-        return self.events[-limit:] if self.events else []
\ No newline at end of file
+        return list(itertools.islice(self.events, max(0, len(self.events) - limit), None))
\ No newline at end of file
@@ -0,0 +1,52 @@
+"""
+jsonio.py
+=========
+Shared JSON helpers
+orjson when installed, stdlib json otherwise
+"""
+
+import json
+import time
+
+# Optional fast JSON (falls back to stdlib json)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj, indent=False, default=None) -> bytes:
+    """Serialize to UTF-8 JSON bytes; compact unless indent (orjson if installed)"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=default, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        return json.dumps(obj, indent=2, default=default).encode("utf-8")
+    # No indentation: machine-read files, and indent=2 roughly doubles their size
+    return json.dumps(obj, separators=(",", ":"), default=default).encode("utf-8")
+
+
+def dumps_line(obj, default=None) -> bytes:
+    """One compact JSON line (for append-only logs)"""
+    return dumps(obj, default=default) + b"\n"
+
+
+def loads(raw):
+    """Parse JSON bytes or str; raises json.JSONDecodeError on bad content"""
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+# [second, formatted "%Y-%m-%dT%H:%M:%S"] for the last second now_iso saw
+_iso_cache = [None, ""]
+
+
+def now_iso() -> str:
+    """Local time as ISO 8601 with microseconds (time.strftime is C, no datetime object)"""
+    t = time.time()
+    sec = int(t)
+    c = _iso_cache
+    if c[0] != sec:
+        # Only format the date/time part once per wall-clock second
+        c[1] = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(sec))
+        c[0] = sec
+    return c[1] + ".%06d" % (int(t * 1e6) % 1000000)
@@ -7,54 +7,184 @@ Phase 1.4: JSON-based memory with simple similarity
 
 import os
 import json
-from datetime import datetime
+import time
+import atexit
+import functools
+import bisect
+from collections import Counter, defaultdict
 from typing import List, Dict, Any
+
+from core.jsonio import dumps, dumps_line, loads, now_iso
+from core.writer import BackgroundWriter, write_atomic
 import difflib
 
+# Optional C++ string similarity (falls back to difflib)
+try:
+    from rapidfuzz.fuzz import ratio as _fuzz_ratio
+except ImportError:
+    _fuzz_ratio = None
+
+
+# save_experience writes the file at most every MEMORY_FLUSH_INTERVAL seconds
+# or every MEMORY_FLUSH_EVERY experiences; flush() (also run at exit) writes the rest
+MEMORY_FLUSH_INTERVAL = 2.0
+MEMORY_FLUSH_EVERY = 50
+
+
+@functools.lru_cache(maxsize=4096)
+def _lower(text: str) -> str:
+    """str.lower, memoized: stored suggestions are lowered once, not per comparison"""
+    return text.lower()
+
+
+@functools.lru_cache(maxsize=4096)
+def _text_ratio(text1: str, text2: str) -> float:
+    """Similarity ratio in [0, 1] of two already-lowercased strings, memoized per pair"""
+    if _fuzz_ratio is not None:
+        # Normalized InDel similarity (2*LCS/total, 0-100 scale). Not the same number
+        # as difflib's Ratcliff/Obershelp ratio: it is never lower and often a bit
+        # higher, so borderline find_similar matches depend on whether rapidfuzz is
+        # installed. Accepted: this term is only 0.3 of the score
+        return _fuzz_ratio(text1, text2) / 100.0
+    return difflib.SequenceMatcher(None, text1, text2).ratio()
+
+
 class MVPMemory:
     """MVP Memory System"""
     
     def __init__(self, memory_file="memory/mvp_memory.json"):
         self.memory_file = memory_file
+        # Experiences are appended here one JSON line each; memory_file keeps the rest
+        self.experience_log = os.path.splitext(memory_file)[0] + ".jsonl"
         os.makedirs(os.path.dirname(memory_file), exist_ok=True)
+        # File writes happen off the calling thread (see flush)
+        self._writer = BackgroundWriter(memory_file, "memory")
         self.memory_data = self._load_memory()
+        self._log_fp = self._open_experience_log()
+        
+        # app / activity -> ascending positions in experiences; only experiences
+        # sharing one of them can pass the find_similar threshold
+        self._by_app = defaultdict(list)
+        self._by_activity = defaultdict(list)
+        # Running per-app totals for get_statistics
+        self._app_counts = Counter()
+        for pos, exp in enumerate(self.memory_data.get("experiences", [])):
+            self._index_experience(pos, exp)
+        
+        self._dirty = False
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        atexit.register(self.flush)
     
     def _load_memory(self) -> Dict[str, Any]:
         """Load memory from file"""
         if os.path.exists(self.memory_file):
             try:
-                with open(self.memory_file, 'r') as f:
-                    data = json.load(f)
-                    # Ensure experiences have proper structure
-                    if "experiences" in data:
-                        for exp in data["experiences"]:
-                            if "analysis" not in exp:
-                                exp["analysis"] = {
-                                    "app": exp.get("app", "unknown"),
-                                    "activity": exp.get("activity", "unknown"),
-                                    "error_detected": exp.get("error_detected", False),
-                                    "suggestion": exp.get("suggestion", ""),
-                                    "mode": exp.get("mode", "unknown")
-                                }
-                    return data
+                with open(self.memory_file, 'rb') as f:
+                    # Old-format experiences without an "analysis" field are
+                    # handled where they are read (_analysis_of), not fixed up here
+                    return loads(f.read())
             except json.JSONDecodeError:
                 print("⚠ Memory file corrupted, creating new one")
         
         # Create new memory structure
+        now = now_iso()
         return {
             "version": "0.1.1",
-            "created": datetime.now().isoformat(),
-            "last_updated": datetime.now().isoformat(),
+            "created": now,
+            "last_updated": now,
             "experiences": [],
             "patterns": []
         }
     
+    def _open_experience_log(self):
+        """Load the experience log into memory_data and open it for appending"""
+        experiences = []
+        migrated = False
+        line = b"\n"
+        try:
+            with open(self.experience_log, 'rb') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = loads(line)
+                    except json.JSONDecodeError:
+                        continue  # e.g. a line cut short by a crash
+                    if record.get("kind") == "migrated":
+                        migrated = True
+                    else:
+                        experiences.append(record)
+        except FileNotFoundError:
+            pass
+        
+        # After a migration any inline experiences are stale copies of logged ones
+        inline = [] if migrated else self.memory_data.get("experiences") or []
+        had_inline = bool(self.memory_data.get("experiences"))
+        self.memory_data["experiences"] = experiences + inline
+        
+        try:
+            # Unbuffered: one write() per experience, nothing is ever rewritten
+            fp = open(self.experience_log, 'ab', buffering=0)
+        except OSError as e:
+            # Experiences simply stay inline in memory_file
+            print(f"⚠ Experience log unavailable: {e}")
+            return None
+        
+        if not line.endswith(b"\n"):
+            # Terminate a line cut short by a crash so the next record starts clean
+            fp.write(b"\n")
+        
+        # Older memory files keep experiences inline; move them into the log once.
+        # The experiences and a "migrated" marker go in one write, so a header
+        # rewrite that never lands leaves the inline copy to be dropped, not re-appended
+        if inline:
+            moved = [dumps_line(exp) for exp in inline]
+            moved.append(dumps_line({"kind": "migrated", "created": self.memory_data.get("created")}))
+            fp.write(b"".join(moved))
+        
+        if had_inline:
+            # Rewrite the header file without the migrated experiences, before returning
+            self.memory_data["last_updated"] = now_iso()
+            header = {k: v for k, v in self.memory_data.items() if k != "experiences"}
+            try:
+                write_atomic(self.memory_file, dumps(header))
+            except OSError as e:
+                print(f"⚠ Failed to save memory: {e}")
+        return fp
+    
+    @staticmethod
+    def _analysis_of(exp: Dict) -> Dict:
+        """Analysis stored with an experience - handle both old and new formats"""
+        exp_analysis = exp.get("analysis", {})
+        if not exp_analysis:
+            # If no analysis field, create one from the experience data
+            exp_analysis = {
+                "app": exp.get("app", "unknown"),
+                "activity": exp.get("activity", "unknown"),
+                "error_detected": exp.get("error_detected", False),
+                "suggestion": exp.get("suggestion", ""),
+                "mode": exp.get("mode", "unknown")
+            }
+        return exp_analysis
+    
+    def _index_experience(self, pos: int, exp: Dict):
+        """Add an experience's position to the app/activity indexes"""
+        self._app_counts[exp.get("app", "unknown")] += 1
+        exp_analysis = self._analysis_of(exp)
+        app = exp_analysis.get("app", "unknown")
+        if app != "unknown":
+            self._by_app[app].append(pos)
+        activity = exp_analysis.get("activity", "unknown")
+        if activity != "unknown":
+            self._by_activity[activity].append(pos)
+    
     def save_experience(self, screenshot_path: str, analysis: Dict) -> int:
         """Save an experience to memory"""
         # Create experience entry with analysis properly embedded
         experience = {
             "id": len(self.memory_data.get("experiences", [])) + 1,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now_iso(),
             "screenshot": screenshot_path,
             "analysis": analysis,  # Store the full analysis object
             "app": analysis.get("app", "unknown"),
@@ -69,10 +199,20 @@ class MVPMemory:
             self.memory_data["experiences"] = []
         
         self.memory_data["experiences"].append(experience)
-        self.memory_data["last_updated"] = datetime.now().isoformat()
+        self._index_experience(len(self.memory_data["experiences"]) - 1, experience)
+        if self._log_fp is not None:
+            try:
+                # O(1): only the new experience is written
+                self._log_fp.write(dumps_line(experience))
+            except (OSError, ValueError) as e:
+                print(f"⚠ Failed to log experience: {e}")
         
-        # Save to file
-        self._save_memory()
+        # Coalesce header writes (last_updated): rewrite only once enough has piled up
+        self._dirty = True
+        self._pending += 1
+        if (self._pending >= MEMORY_FLUSH_EVERY
+                or time.monotonic() - self._last_flush > MEMORY_FLUSH_INTERVAL):
+            self._save_memory()
         
         return experience["id"]
     
@@ -84,18 +224,19 @@ class MVPMemory:
         
         similarities = []
         
-        for exp in experiences[-50:]:  # Check last 50 experiences
-            # Get analysis from experience - handle both old and new formats
-            exp_analysis = exp.get("analysis", {})
-            if not exp_analysis:
-                # If no analysis field, create one from the experience data
-                exp_analysis = {
-                    "app": exp.get("app", "unknown"),
-                    "activity": exp.get("activity", "unknown"),
-                    "error_detected": exp.get("error_detected", False),
-                    "suggestion": exp.get("suggestion", ""),
-                    "mode": exp.get("mode", "unknown")
-                }
+        # Check last 50 experiences, but only those with the same app or activity:
+        # text similarity alone is worth at most 0.3, which never clears the threshold
+        start = max(0, len(experiences) - 50)
+        candidates = set()
+        for index, key in ((self._by_app, current_analysis.get("app", "unknown")),
+                           (self._by_activity, current_analysis.get("activity", "unknown"))):
+            positions = index.get(key)
+            if positions and key != "unknown":
+                candidates.update(positions[bisect.bisect_left(positions, start):])
+        
+        for pos in sorted(candidates):
+            exp = experiences[pos]
+            exp_analysis = self._analysis_of(exp)
             
             similarity_score = self._calculate_similarity(current_analysis, exp_analysis)
             
@@ -109,7 +250,7 @@ class MVPMemory:
         return [exp for score, exp in similarities[:limit]]
     
     def _calculate_similarity(self, analysis1: Dict, analysis2: Dict) -> float:
-        """Calculate similarity between two analyses"""
+        """Calculate similarity between two analyses (0.0 unless app or activity match)"""
         score = 0.0
         
         # Compare app
@@ -124,24 +265,45 @@ class MVPMemory:
         if activity1 == activity2 and activity1 != "unknown":
             score += 0.3
         
+        if score == 0.0:
+            # Text alone adds at most 0.3, never above find_similar's threshold
+            return score
+        
         # Text similarity for suggestion
         suggestion1 = analysis1.get("suggestion", "")
         suggestion2 = analysis2.get("suggestion", "")
         
         if suggestion1 and suggestion2:
             try:
-                seq = difflib.SequenceMatcher(None, suggestion1.lower(), suggestion2.lower())
-                score += seq.ratio() * 0.3
+                # A monitoring loop compares the same suggestions over and over
+                score += _text_ratio(_lower(suggestion1), _lower(suggestion2)) * 0.3
             except:
                 pass  # Ignore similarity calculation errors
         
         return score
     
+    def flush(self):
+        """Write memory to file if anything changed, and wait until it is on disk"""
+        if self._dirty:
+            self._save_memory()
+        self._writer.flush()
+    
     def _save_memory(self):
         """Save memory to file"""
+        # Stamped per write rather than per experience
+        self.memory_data["last_updated"] = now_iso()
+        
+        # Experiences live in the append log; only the header is rewritten
+        data = self.memory_data
+        if self._log_fp is not None:
+            data = {k: v for k, v in data.items() if k != "experiences"}
+        
         try:
-            with open(self.memory_file, 'w') as f:
-                json.dump(self.memory_data, f, indent=2)
+            # Serialize here (a consistent snapshot); the writer thread does the I/O
+            self._writer.submit(dumps(data))
+            self._dirty = False
+            self._pending = 0
+            self._last_flush = time.monotonic()
         except Exception as e:
             print(f"⚠ Failed to save memory: {e}")
     
@@ -149,14 +311,9 @@ class MVPMemory:
         """Get memory statistics"""
         experiences = self.memory_data.get("experiences", [])
         
-        # Count by app
-        app_counts = {}
-        for exp in experiences:
-            app = exp.get("app", "unknown")
-            app_counts[app] = app_counts.get(app, 0) + 1
-        
+        # Count by app (kept current by _index_experience)
         return {
             "total_experiences": len(experiences),
-            "app_distribution": app_counts,
+            "app_distribution": dict(self._app_counts),
             "last_updated": self.memory_data.get("last_updated", "never")
         }
\ No newline at end of file
@@ -0,0 +1,79 @@
+"""
+writer.py
+=========
+Background file writer
+Keeps JSON rewrites off the capture/analysis thread
+"""
+
+import os
+import threading
+
+
+def write_atomic(path: str, data: bytes, fsync: bool = True):
+    """Replace path with data via a temp file + rename (readers never see a partial file)
+
+    With fsync the data is on disk before the rename, so a crash leaves
+    either the old file or the new one.
+    """
+    tmp_path = path + ".tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        if fsync:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tmp_path, path)
+
+
+class BackgroundWriter:
+    """Writes the latest submitted payload to one file on a daemon thread.
+
+    Payloads that arrive while a write is in progress replace each other, so
+    only the newest one is written next. Each write goes to a temp file that
+    is renamed over the target, so readers never see a partial file. flush()
+    writes anything still pending on the calling thread and waits for an
+    in-progress write.
+    """
+
+    def __init__(self, path: str, label: str = "file"):
+        self.path = path
+        self.label = label
+        self._payload = None
+        self._lock = threading.Lock()        # guards _payload
+        self._write_lock = threading.Lock()  # one write at a time, in order
+        self._wake = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"writer-{label}", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, payload: bytes):
+        """Queue bytes to be written; returns immediately"""
+        with self._lock:
+            self._payload = payload
+        self._wake.set()
+
+    def flush(self):
+        """Block until the latest submitted payload is on disk"""
+        self._write_pending()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            self._write_pending()
+
+    def _write_pending(self):
+        with self._write_lock:
+            with self._lock:
+                payload, self._payload = self._payload, None
+            if payload is None:
+                return
+            try:
+                # No fsync: this runs every few seconds and the next write supersedes it
+                write_atomic(self.path, payload, fsync=False)
+            except Exception as e:
+                print(f"⚠ Failed to save {self.label}: {e}")
@@ -11,8 +11,12 @@ import time
 import json
 from datetime import datetime
 import threading
-import tkinter as tk
-from tkinter import scrolledtext, ttk
+import queue
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Bound by run_gui_mode: CLI, single and test runs never load Tk
+tk = scrolledtext = ttk = None
 
 # Add the current directory to the path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -24,6 +28,46 @@ from core.memory import MVPMemory
 from core.event_stream import EventStream
 from core.blueprint_tracker import BlueprintTracker
 
+# [second, "%H:%M:%S"] for the last second _now_hms saw
+_hms_cache = [None, ""]
+
+
+def _now_hms() -> str:
+    """Local time of day, formatted once per second"""
+    sec = int(time.time())
+    c = _hms_cache
+    if c[0] != sec:
+        c[1] = time.strftime("%H:%M:%S", time.localtime(sec))
+        c[0] = sec
+    return c[1]
+
+
+# How often the GUI applies log/status updates queued by the analysis thread
+GUI_DRAIN_MS = 50
+
+# Fixed result of the fallback analyzer; analyze() hands out copies
+_FALLBACK_ANALYSIS = {
+    "app": "unknown",
+    "activity": "fallback_analysis",
+    "error_detected": False,
+    "suggestion": "Using local fallback analyzer",
+    "confidence": 0.3,
+    "mode": "local_fallback",
+    "analysis_time": 0.1
+}
+
+
+class MinimalAnalyzer:
+    """Local stand-in used when the Gemini analyzer cannot be created"""
+    
+    def analyze(self, screenshot_path, context=None, image=None):
+        # A copy, since callers store (and may change) the result
+        return _FALLBACK_ANALYSIS.copy()
+    
+    def detect_app_from_screenshot(self, screenshot_path):
+        return "unknown"
+
+
 class CMVisionHybrid:
     """Main CM Vision Hybrid system"""
     
@@ -52,6 +96,9 @@ class CMVisionHybrid:
         self.event_stream = EventStream()
         print(f"✓ Event stream ready ({self.event_stream.phase})")
         
+        # Set to end the capture loops; waiting on it (not time.sleep) makes Stop immediate
+        self._stop_event = threading.Event()
+        
         # System ready
         print("\n[4/5] System initialized!")
         self._print_system_status()
@@ -96,21 +143,6 @@ class CMVisionHybrid:
         
     def _create_minimal_analyzer(self):
         """Create a minimal analyzer for fallback"""
-        class MinimalAnalyzer:
-            def analyze(self, screenshot_path, context=None):
-                return {
-                    "app": "unknown",
-                    "activity": "fallback_analysis",
-                    "error_detected": False,
-                    "suggestion": "Using local fallback analyzer",
-                    "confidence": 0.3,
-                    "mode": "local_fallback",
-                    "analysis_time": 0.1
-                }
-            
-            def detect_app_from_screenshot(self, screenshot_path):
-                return "unknown"
-        
         return MinimalAnalyzer()
     
     def _print_system_status(self):
@@ -137,7 +169,8 @@ class CMVisionHybrid:
         
         # Capture
         print("[1/3] Capture...")
-        screenshot_path = self.capture.capture()
+        screenshot_path, frame = self.capture.capture_frame()
+        context = self.capture.window_context()
         if not screenshot_path:
             print("❌ Capture failed")
             return
@@ -146,7 +179,8 @@ class CMVisionHybrid:
         
         # Analyze
         print("[2/3] Analyze...")
-        analysis = self.analyzer.analyze(screenshot_path)
+        # Analyze the frame in memory; the PNG keeps writing in the background
+        analysis = self.analyzer.analyze(screenshot_path, context=context, image=frame)
         
         # Log event
         self.event_stream.add_event("capture", {
@@ -192,83 +226,111 @@ class CMVisionHybrid:
         print("Press Ctrl+C to stop")
         print("-" * 40)
         
+        # Analyze + save of capture N runs on one worker while the loop waits for
+        # and takes capture N+1; at most one analysis is in flight (results stay in order)
+        self.cli_capture_count = 0
+        pipeline = ThreadPoolExecutor(max_workers=1)
+        pending = None
         try:
-            capture_count = 0
             while True:
-                cycle_start = time.time()
-                print(f"\n[{datetime.now().strftime('%H:%M:%S')}] Capture...")
+                # Monotonic: cycle timing is unaffected by wall-clock adjustments
+                cycle_start = time.monotonic()
+                print(f"\n[{_now_hms()}] Capture...")
                 
                 # Capture
-                screenshot_path = self.capture.capture()
+                screenshot_path, frame = self.capture.capture_frame()
+                # Window title at capture time (the analyzer's near-duplicate check needs it)
+                context = self.capture.window_context()
                 if screenshot_path:
                     print(f"  ✓ Saved: {screenshot_path}")
                     
-                    # Analyze
-                    print("  Analyzing...")
-                    analysis_start = time.time()
-                    analysis = self.analyzer.analyze(screenshot_path)
-                    analysis_time = time.time() - analysis_start
-                    
-                    print(f"  ⏱️  Analysis time: {analysis_time:.1f}s")
-                    
-                    # Save to memory
-                    print("  Saving to memory...")
-                    memory_id = self.memory.save_experience(
-                        screenshot_path=screenshot_path,
-                        analysis=analysis
-                    )
-                    
-                    # Log MVP progress
-                    self.tracker.log_milestone("basic_memory", f"Memory item #{memory_id} saved")
-                    
-                    print(f"  ✓ Memory ID: {memory_id}")
-                    
-                    # Find similar experiences
-                    print("⚠ Tech debt logged: Basic text similarity search -> Will fix with Vector embeddings + semantic search")
-                    similar = self.memory.find_similar(analysis)
-                    if similar:
-                        print(f"  🔍 Found {len(similar)} similar past experiences")
-                        # Get a suggestion
-                        if similar[0].get('suggestion'):
-                            print(f"  💡 Suggestion: {similar[0].get('suggestion')[:80]}...")
-                    
-                    # Update event stream
-                    self.event_stream.add_event("analysis", {
-                        "memory_id": memory_id,
-                        "app": analysis.get("app", "unknown"),
-                        "similar_count": len(similar) if similar else 0,
-                        "analysis_time": analysis_time
-                    })
-                    
-                    capture_count += 1
-                    
-                    # Update tracker stats
-                    self.tracker.update_mvp_stats({
-                        "total_captures": capture_count,
-                        "memory_items": memory_id,
-                        "suggestions_given": self.tracker.mvp_state.suggestions_given + (1 if similar else 0)
-                    })
-                    
-                    # Calculate cycle time
-                    cycle_time = time.time() - cycle_start
-                    print(f"  ✅ Pipeline complete ({cycle_time:.1f}s total)")
-                    
-                    # Adjust wait time based on actual cycle time
-                    if cycle_time < self.config.capture_interval:
-                        wait_time = self.config.capture_interval - cycle_time
-                        print(f"  ⏳ Waiting {wait_time:.1f}s for next capture...")
-                        time.sleep(wait_time)
-                    else:
-                        print(f"  ⚠ Cycle took {cycle_time:.1f}s (longer than {self.config.capture_interval}s interval)")
-                        # Continue immediately if we're behind schedule
-                        time.sleep(1)  # Small pause to avoid 100% CPU
+                    # Backpressure: wait for the previous analysis before queueing this one
+                    if pending is not None:
+                        pending.result()
+                    pending = pipeline.submit(self._process_cli_capture, screenshot_path, context, frame, cycle_start)
+                
+                # Calculate cycle time (capture plus any wait on the previous analysis)
+                cycle_time = time.monotonic() - cycle_start
                 
+                # Adjust wait time based on actual cycle time
+                if cycle_time < self.config.capture_interval:
+                    wait_time = self.config.capture_interval - cycle_time
+                    print(f"  ⏳ Waiting {wait_time:.1f}s for next capture...")
+                    if self._stop_event.wait(cycle_start + self.config.capture_interval - time.monotonic()):
+                        break
+                else:
+                    # Continue immediately if we're behind schedule (the capture
+                    # itself paces the loop, so there is no busy spin)
+                    print(f"  ⚠ Cycle took {cycle_time:.1f}s (longer than {self.config.capture_interval}s interval)")
+                    if self._stop_event.is_set():
+                        break
+            
+            pipeline.shutdown(wait=True)
+            return self.cli_capture_count
+            
         except KeyboardInterrupt:
             print("\n\n⏹️  Stopped by user")
-            return capture_count
+            # Let the in-flight analysis finish so its memory item is kept
+            pipeline.shutdown(wait=True)
+            return self.cli_capture_count
+    
+    def _process_cli_capture(self, screenshot_path, context, frame, cycle_start):
+        """Analyze, save and report one CLI capture (runs on the pipeline worker)"""
+        # Analyze
+        print("  Analyzing...")
+        analysis_start = time.time()
+        # Analyze the frame in memory; the PNG keeps writing in the background
+        analysis = self.analyzer.analyze(screenshot_path, context=context, image=frame)
+        analysis_time = time.time() - analysis_start
+        
+        print(f"  ⏱️  Analysis time: {analysis_time:.1f}s")
+        
+        # Save to memory
+        print("  Saving to memory...")
+        memory_id = self.memory.save_experience(
+            screenshot_path=screenshot_path,
+            analysis=analysis
+        )
+        
+        # Log MVP progress
+        self.tracker.log_milestone("basic_memory", f"Memory item #{memory_id} saved")
+        
+        print(f"  ✓ Memory ID: {memory_id}")
+        
+        # Find similar experiences
+        print("⚠ Tech debt logged: Basic text similarity search -> Will fix with Vector embeddings + semantic search")
+        similar = self.memory.find_similar(analysis)
+        if similar:
+            print(f"  🔍 Found {len(similar)} similar past experiences")
+            # Get a suggestion
+            if similar[0].get('suggestion'):
+                print(f"  💡 Suggestion: {similar[0].get('suggestion')[:80]}...")
+        
+        # Update event stream
+        self.event_stream.add_event("analysis", {
+            "memory_id": memory_id,
+            "app": analysis.get("app", "unknown"),
+            "similar_count": len(similar) if similar else 0,
+            "analysis_time": analysis_time
+        })
+        
+        self.cli_capture_count += 1
+        
+        # Update tracker stats
+        self.tracker.update_mvp_stats({
+            "total_captures": self.cli_capture_count,
+            "memory_items": memory_id,
+            "suggestions_given": self.tracker.mvp_state.suggestions_given + (1 if similar else 0)
+        })
+        
+        print(f"  ✅ Pipeline complete ({time.monotonic() - cycle_start:.1f}s total)")
     
     def run_gui_mode(self):
         """Run in GUI mode"""
+        global tk, scrolledtext, ttk
+        import tkinter as tk
+        from tkinter import scrolledtext, ttk
+        
         print("\n🚀 Launching MVP GUI...")
         print("⚠ Tech debt logged: Tkinter basic GUI -> Will fix with PyQt6 overlay with screen annotation")
         
@@ -281,8 +343,13 @@ class CMVisionHybrid:
         self.running = False
         self.capture_count = 0
         
+        # Widgets are only touched on the Tk thread: the analysis thread queues
+        # log lines and status updates, drained every GUI_DRAIN_MS by the main loop
+        self.ui_queue = queue.Queue()
+        
         # Build GUI
         self._build_gui()
+        self.gui_root.after(GUI_DRAIN_MS, self._drain_ui_queue)
         
         # Start the GUI
         print(f"[{datetime.now().strftime('%H:%M:%S')}] CM Vision MVP started")
@@ -353,11 +420,32 @@ class CMVisionHybrid:
         self._log_message("Ready to start analysis")
     
     def _log_message(self, message):
-        """Add a message to the log"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
-        self.log_text.see(tk.END)
-        self.gui_root.update()
+        """Add a message to the log (safe from any thread)"""
+        timestamp = _now_hms()
+        self.ui_queue.put(("log", f"[{timestamp}] {message}\n"))
+    
+    def _set_status(self, label, text):
+        """Update a status label (safe from any thread)"""
+        self.ui_queue.put(("status", label, text))
+    
+    def _drain_ui_queue(self):
+        """Apply queued log lines and status updates on the Tk thread"""
+        lines = []
+        try:
+            while True:
+                item = self.ui_queue.get_nowait()
+                if item[0] == "log":
+                    lines.append(item[1])
+                else:
+                    self.status_labels[item[1]].config(text=item[2])
+        except queue.Empty:
+            pass
+        
+        if lines:
+            # One insert and one scroll for the whole batch
+            self.log_text.insert(tk.END, "".join(lines))
+            self.log_text.see(tk.END)
+        self.gui_root.after(GUI_DRAIN_MS, self._drain_ui_queue)
     
     def _start_analysis(self):
         """Start continuous analysis"""
@@ -365,6 +453,7 @@ class CMVisionHybrid:
             return
         
         self.running = True
+        self._stop_event.clear()
         self.start_button.config(state=tk.DISABLED)
         self.stop_button.config(state=tk.NORMAL)
         
@@ -378,88 +467,110 @@ class CMVisionHybrid:
     def _stop_analysis(self):
         """Stop continuous analysis"""
         self.running = False
+        self._stop_event.set()  # Wakes the analysis thread if it is waiting
         self.start_button.config(state=tk.NORMAL)
         self.stop_button.config(state=tk.DISABLED)
         self._log_message("Stopped analysis")
     
     def _run_continuous_analysis(self):
         """Run continuous analysis in background thread"""
+        # Same pipeline as CLI mode: capture N+1 is taken while capture N is
+        # analyzed on one worker (in order; memory IDs and stats stay sequential)
+        pipeline = ThreadPoolExecutor(max_workers=1)
+        pending = None
         while self.running:
             try:
-                cycle_start = time.time()
+                cycle_start = time.monotonic()
                 self._log_message("Capture...")
                 
                 # Capture
-                screenshot_path = self.capture.capture()
+                screenshot_path, frame = self.capture.capture_frame()
+                # Window title at capture time (the analyzer's near-duplicate check needs it)
+                context = self.capture.window_context()
                 if screenshot_path:
                     self._log_message(f"  ✓ Saved: {screenshot_path}")
                     
-                    # Analyze
-                    self._log_message("  Analyzing...")
-                    analysis = self.analyzer.analyze(screenshot_path)
-                    
-                    # Save to memory
-                    self._log_message("  Saving to memory...")
-                    memory_id = self.memory.save_experience(
-                        screenshot_path=screenshot_path,
-                        analysis=analysis
-                    )
-                    
-                    # Log MVP progress
-                    self.tracker.log_milestone("basic_memory", f"Memory item #{memory_id} saved")
-                    
-                    self._log_message(f"  ✓ Memory ID: {memory_id}")
-                    
-                    # Find similar experiences
-                    self._log_message("⚠ Tech debt logged: Basic text similarity search -> Will fix with Vector embeddings + semantic search")
-                    similar = self.memory.find_similar(analysis)
-                    if similar:
-                        self._log_message(f"  🔍 Found {len(similar)} similar past experiences")
-                        # Get a suggestion
-                        if similar[0].get('suggestion'):
-                            suggestion = similar[0].get('suggestion')
-                            self._log_message(f"  💡 Suggestion: {suggestion[:80]}...")
-                    
-                    # Update event stream
-                    self.event_stream.add_event("analysis", {
-                        "memory_id": memory_id,
-                        "app": analysis.get("app", "unknown"),
-                        "similar_count": len(similar) if similar else 0,
-                        "analysis_time": analysis.get("analysis_time", 0)
-                    })
-                    
-                    self.capture_count += 1
-                    
-                    # Update status
-                    self.status_labels["Captures:"].config(text=str(self.capture_count))
-                    self.status_labels["Memory:"].config(text=f"{memory_id} items")
-                    
-                    # Update tracker stats
-                    self.tracker.update_mvp_stats({
-                        "total_captures": self.capture_count,
-                        "memory_items": memory_id,
-                        "suggestions_given": self.tracker.mvp_state.suggestions_given + (1 if similar else 0)
-                    })
-                    
-                    cycle_time = time.time() - cycle_start
-                    self._log_message(f"  ✅ Pipeline complete ({cycle_time:.1f}s)")
-                    self._log_message(f"  Analyzed: {analysis.get('app', 'unknown')} - {analysis.get('activity', 'unknown')}")
-                    
-                    # Log tech debt
-                    if analysis.get('mode') == 'local_fallback':
-                        self._log_message("⚠ Tech debt logged: Basic text similarity search -> Will fix with Vector embeddings + semantic search")
+                    # Backpressure: wait for the previous analysis before queueing this one
+                    if pending is not None:
+                        wait([pending])
+                    pending = pipeline.submit(self._process_gui_capture, screenshot_path, context, frame, cycle_start)
+                    pending.add_done_callback(self._report_gui_failure)
                 
-                # Calculate wait time
-                cycle_time = time.time() - cycle_start
-                if cycle_time < self.config.capture_interval:
-                    wait_time = self.config.capture_interval - cycle_time
-                    time.sleep(wait_time)
-                else:
-                    time.sleep(1)  # Small pause if we're behind
+                # Wait until the next cycle is due (returns at once on Stop;
+                # no pause at all if we're behind)
+                if self._stop_event.wait(max(0, cycle_start + self.config.capture_interval - time.monotonic())):
+                    break
                 
             except Exception as e:
                 self._log_message(f"❌ Error in analysis: {str(e)}")
-                time.sleep(5)  # Wait a bit before retrying
+                if self._stop_event.wait(5):  # Wait a bit before retrying
+                    break
+        
+        # Let the in-flight analysis finish so its memory item is kept
+        pipeline.shutdown(wait=True)
+    
+    def _report_gui_failure(self, future):
+        """Log an exception raised by _process_gui_capture (runs on the worker)"""
+        e = future.exception()
+        if e is not None:
+            self._log_message(f"❌ Error in analysis: {str(e)}")
+    
+    def _process_gui_capture(self, screenshot_path, context, frame, cycle_start):
+        """Analyze, save and report one GUI capture (runs on the pipeline worker)"""
+        # Analyze the frame in memory; the PNG keeps writing in the background
+        self._log_message("  Analyzing...")
+        analysis = self.analyzer.analyze(screenshot_path, context=context, image=frame)
+        
+        # Save to memory
+        self._log_message("  Saving to memory...")
+        memory_id = self.memory.save_experience(
+            screenshot_path=screenshot_path,
+            analysis=analysis
+        )
+        
+        # Log MVP progress
+        self.tracker.log_milestone("basic_memory", f"Memory item #{memory_id} saved")
+        
+        self._log_message(f"  ✓ Memory ID: {memory_id}")
+        
+        # Find similar experiences
+        self._log_message("⚠ Tech debt logged: Basic text similarity search -> Will fix with Vector embeddings + semantic search")
+        similar = self.memory.find_similar(analysis)
+        if similar:
+            self._log_message(f"  🔍 Found {len(similar)} similar past experiences")
+            # Get a suggestion
+            if similar[0].get('suggestion'):
+                suggestion = similar[0].get('suggestion')
+                self._log_message(f"  💡 Suggestion: {suggestion[:80]}...")
+        
+        # Update event stream
+        self.event_stream.add_event("analysis", {
+            "memory_id": memory_id,
+            "app": analysis.get("app", "unknown"),
+            "similar_count": len(similar) if similar else 0,
+            "analysis_time": analysis.get("analysis_time", 0)
+        })
+        
+        self.capture_count += 1
+        
+        # Update status
+        self._set_status("Captures:", str(self.capture_count))
+        self._set_status("Memory:", f"{memory_id} items")
+        
+        # Update tracker stats
+        self.tracker.update_mvp_stats({
+            "total_captures": self.capture_count,
+            "memory_items": memory_id,
+            "suggestions_given": self.tracker.mvp_state.suggestions_given + (1 if similar else 0)
+        })
+        
+        cycle_time = time.monotonic() - cycle_start
+        self._log_message(f"  ✅ Pipeline complete ({cycle_time:.1f}s)")
+        self._log_message(f"  Analyzed: {analysis.get('app', 'unknown')} - {analysis.get('activity', 'unknown')}")
+        
+        # Log tech debt
+        if analysis.get('mode') == 'local_fallback':
+            self._log_message("⚠ Tech debt logged: Basic text similarity search -> Will fix with Vector embeddings + semantic search")
     
     def run_test_mode(self):
         """Run test mode for validation"""
@@ -468,7 +579,8 @@ class CMVisionHybrid:
         
         # Run a single capture
         print("\n[1/4] Capture...")
-        screenshot_path = self.capture.capture()
+        screenshot_path, frame = self.capture.capture_frame()
+        context = self.capture.window_context()
         if not screenshot_path:
             print("❌ Test failed: Capture error")
             return False
@@ -477,7 +589,8 @@ class CMVisionHybrid:
         
         # Analyze
         print("[2/4] Analyze...")
-        analysis = self.analyzer.analyze(screenshot_path)
+        # Analyze the frame in memory; the PNG keeps writing in the background
+        analysis = self.analyzer.analyze(screenshot_path, context=context, image=frame)
         print(f"  ✓ Analysis complete")
         print(f"  ⏱️  Time: {analysis.get('analysis_time', 0):.1f}s")
         
@@ -591,7 +704,6 @@ def main():
         print("\n\n⏹️  Interrupted by user")
     except Exception as e:
         print(f"\n❌ Unexpected error: {e}")
-        import traceback
         traceback.print_exc()
     finally:
         if system:
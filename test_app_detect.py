@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Window-title app detection (capture/app_detect.py)
+Run with pytest or directly: python test_app_detect.py
+"""
+from capture.app_detect import detect_app
+
+
+def test_editor_titles_with_office_and_browser_substrings():
+    assert detect_app("knowledge.md - Visual Studio Code") == ("vscode", "VS Code")
+    assert detect_app("edge-cases.py - Visual Studio Code") == ("vscode", "VS Code")
+    assert detect_app("teams_sync.py - PyCharm") == ("pycharm", "PyCharm")
+
+
+def test_patterns_match_whole_words_only():
+    assert detect_app("Password Manager - Settings")[0] != "word"
+    assert detect_app("Knowledge base")[0] != "edge"
+    assert detect_app("Steams of data")[0] != "teams"
+
+
+def test_editors_and_terminals_beat_browsers_and_office():
+    assert detect_app("main.py - vscode - Microsoft Edge") == ("vscode", "VS Code")
+    assert detect_app("Windows PowerShell") == ("terminal", "PowerShell")
+    assert detect_app("Report.docx - Word") == ("word", "Word")
+    assert detect_app("New Tab - Microsoft Edge") == ("edge", "Edge")
+    assert detect_app("GitHub - Google Chrome") == ("chrome", "Chrome")
+
+
+def test_unknown_titles():
+    assert detect_app("") == ("unknown_app", "Unknown")
+    assert detect_app("[Untitled] notes") == ("untitled", "Unknown")
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✓ {name}")
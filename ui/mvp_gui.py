@@ -1,11 +1,50 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext
 import threading
+import codecs
 import time
-from datetime import datetime
-from PIL import Image, ImageTk
 import os
 
+# The log tab keeps the newest LOG_MAX_LINES lines; older ones are cut in
+# one delete once LOG_TRIM_BATCH extra lines have piled up
+LOG_MAX_LINES = 500
+LOG_TRIM_BATCH = 100
+
+# show_tracker inserts the tracker file this many bytes at a time
+TRACKER_READ_CHUNK = 65536
+
+# Live Stats refresh period, independent of the capture rate
+STATS_REFRESH_MS = 1000
+
+# (label, get_stats() dict -> value text) rows of the Live Stats panel
+_STATS_ROWS = (
+    ("Total Captures", lambda stats: str(stats.get('captures', 0))),
+    ("Gemini API Calls", lambda stats: str(stats.get('gemini_calls', 0))),
+    ("Memory Items", lambda stats: str(stats.get('memory_items', 0))),
+    ("Uptime", lambda stats: f"{stats.get('uptime', 0):.0f}s"),
+    ("Mode", lambda stats: str(stats.get('mode', 'MVP'))),
+    ("Memory File", lambda stats: "memory/mvp_memory.json"),
+    ("Memory Status", lambda stats: 'Active' if stats.get('memory_items', 0) > 0 else 'Empty'),
+    ("MVP Mode", lambda stats: 'Yes' if stats.get('mvp_mode', True) else 'No'),
+    ("Version", lambda stats: "0.1.0"),
+)
+
+# [second, "%Y-%m-%d %H:%M:%S", "%H:%M:%S"] for the last second _clock saw
+_clock_cache = [None, "", ""]
+
+
+def _clock():
+    """(date and time, time of day) strings for now, formatted once per second"""
+    sec = int(time.time())
+    c = _clock_cache
+    if c[0] != sec:
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(sec))
+        # Strings first: a reader that sees the new second sees them too
+        c[1], c[2] = stamp, stamp[11:]
+        c[0] = sec
+    return c[1], c[2]
+
+
 class MVP_GUI:
     """
     MVP: Simple Tkinter GUI
@@ -15,7 +54,12 @@ class MVP_GUI:
         self.system = cm_system
         self.is_running = False
         self.thread = None
+        # Set by stop_analysis; the loop waits on it, so Stop takes effect at once
+        self._stop_event = threading.Event()
         self.last_result = None
+        self._log_lines = 0
+        # (mtime, chunks) of the last mvp_tracker.json read by show_tracker
+        self._tracker_cache = None
         
         # Create main window
         self.root = tk.Tk()
@@ -98,9 +142,16 @@ class MVP_GUI:
                                    bg="white", padx=10, pady=10)
         stats_frame.pack(fill="x", padx=5, pady=10)
         
-        self.stats_text = tk.Text(stats_frame, height=8, width=30,
-                                 font=("Consolas", 9), bg="#f8f9fa")
-        self.stats_text.pack(fill="both", expand=True)
+        # One label per value: an update only touches the values that changed
+        self.stats_vars = []
+        self._stats_shown = ()
+        for row, (label, _) in enumerate(_STATS_ROWS):
+            tk.Label(stats_frame, text=f"{label}:", font=("Consolas", 9),
+                    bg="white", anchor="w").grid(row=row, column=0, sticky="w")
+            var = tk.StringVar(value="-")
+            tk.Label(stats_frame, textvariable=var, font=("Consolas", 9),
+                    bg="white", anchor="w").grid(row=row, column=1, sticky="w", padx=(5, 0))
+            self.stats_vars.append(var)
         
         # Right panel - Analysis output
         right_frame = tk.Frame(main_paned, bg="#f0f0f0")
@@ -166,6 +217,7 @@ class MVP_GUI:
         """Start continuous analysis"""
         if not self.is_running:
             self.is_running = True
+            self._stop_event.clear()
             self.start_btn.config(state="disabled")
             self.stop_btn.config(state="normal")
             self.status_var.set("🔴 Analyzing every 10s...")
@@ -180,6 +232,7 @@ class MVP_GUI:
     def stop_analysis(self):
         """Stop analysis"""
         self.is_running = False
+        self._stop_event.set()
         self.start_btn.config(state="normal")
         self.stop_btn.config(state="disabled")
         self.status_var.set("🟢 Ready - MVP Mode")
@@ -203,15 +256,14 @@ class MVP_GUI:
             try:
                 self._perform_capture()
                 
-                # Wait for next capture
-                for _ in range(interval * 10):
-                    if not self.is_running:
-                        break
-                    time.sleep(0.1)
+                # Wait for next capture (one wakeup, or none if stopped first)
+                if self._stop_event.wait(interval):
+                    break
                     
             except Exception as e:
                 self.log(f"Error in analysis loop: {e}")
-                time.sleep(interval)
+                if self._stop_event.wait(interval):
+                    break
     
     def _perform_capture(self):
         """Perform a single capture cycle"""
@@ -221,8 +273,9 @@ class MVP_GUI:
             
             if result:
                 self.last_result = result
-                # Update UI in main thread
-                self.root.after(0, self._update_display, result)
+                # Build the display text here (similarity search included),
+                # then apply it in main thread
+                self.root.after(0, self._apply_display, self._render_display(result))
                 app = result['analysis'].get('app_detected', 'Unknown')
                 self.root.after(0, lambda: self.status_var.set(f"✅ {app}"))
             else:
@@ -234,30 +287,31 @@ class MVP_GUI:
     
     def _update_display(self, result):
         """Update all displays with new result"""
+        self._apply_display(self._render_display(result))
+    
+    def _render_display(self, result):
+        """Build every display string for a result (no widget access, any thread)"""
         analysis = result.get("analysis", {})
         
-        # Update analysis title
+        # Analysis title
         app = analysis.get('app_detected', 'Unknown')
         activity = analysis.get('primary_activity', 'unknown')
         confidence = analysis.get('confidence_score', 0) * 100
         
-        self.analysis_title.config(
-            text=f"{app} - {activity} ({confidence:.1f}% confidence)"
-        )
+        title = f"{app} - {activity} ({confidence:.1f}% confidence)"
         
         # Color code based on confidence
         if confidence > 70:
-            self.analysis_title.config(fg="#27ae60")  # Green
+            title_color = "#27ae60"  # Green
         elif confidence > 30:
-            self.analysis_title.config(fg="#f39c12")  # Orange
+            title_color = "#f39c12"  # Orange
         else:
-            self.analysis_title.config(fg="#e74c3c")  # Red
+            title_color = "#e74c3c"  # Red
         
-        # Update analysis text
-        self.analysis_text.delete(1.0, tk.END)
+        errors = analysis.get('potential_errors', [])
         
         display = f"""=== SCREEN ANALYSIS ===
-Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+Time: {_clock()[0]}
 Model: {analysis.get('model_used', 'unknown')}
 
 📱 APPLICATION: {app}
@@ -269,10 +323,9 @@ Model: {analysis.get('model_used', 'unknown')}
 📝 TEXT SUMMARY:
 {analysis.get('visible_text_summary', 'No text detected')}
 
-{'⚠️ POTENTIAL ISSUES:' if analysis.get('potential_errors') else '✅ NO ISSUES DETECTED:'}
+{'⚠️ POTENTIAL ISSUES:' if errors else '✅ NO ISSUES DETECTED:'}
 """
         
-        errors = analysis.get('potential_errors', [])
         if errors:
             for i, error in enumerate(errors, 1):
                 display += f"  {i}. {error}\n"
@@ -282,29 +335,37 @@ Model: {analysis.get('model_used', 'unknown')}
         if analysis.get('window_context'):
             display += f"\n🪟 WINDOW: {analysis.get('window_context', 'Unknown')}"
         
-        if analysis.get('fallback'):
+        if analysis.get('rate_limited'):
+            display += "\n\n⏳ RATE LIMITED: Gemini request budget used up. Using basic detection."
+        elif analysis.get('fallback'):
             display += "\n\n⚠️ FALLBACK MODE: Gemini analysis failed. Using basic detection."
         
-        self.analysis_text.insert(1.0, display)
-        
-        # Update log
-        self.log(f"Analyzed: {app} - {activity}")
+        return {
+            "title": title,
+            "title_color": title_color,
+            "analysis": display,
+            "memory": self._render_memory_display(analysis),
+            "log": f"Analyzed: {app} - {activity}",
+        }
+    
+    def _apply_display(self, rendered):
+        """Write pre-built display strings to the widgets in one pass (main thread)"""
+        self.analysis_title.config(text=rendered["title"], fg=rendered["title_color"])
         
-        # Update memory display
-        self._update_memory_display(analysis)
+        for widget, text in ((self.analysis_text, rendered["analysis"]),
+                             (self.memory_text, rendered["memory"])):
+            widget.delete(1.0, tk.END)
+            widget.insert(1.0, text)
         
-        # Update stats
-        self._update_stats()
+        # Update log
+        self.log(rendered["log"])
     
-    def _update_memory_display(self, current_analysis):
-        """Update memory tab with similar experiences"""
+    def _render_memory_display(self, current_analysis):
+        """Text for the memory tab: similar experiences"""
         similar = self.system.memory.find_similar(current_analysis, limit=5)
         
-        self.memory_text.delete(1.0, tk.END)
-        
         if not similar:
-            self.memory_text.insert(1.0, "No similar past experiences found.")
-            return
+            return "No similar past experiences found."
         
         memory_display = f"""=== SIMILAR PAST EXPERIENCES ===
 Found {len(similar)} similar past experiences
@@ -329,39 +390,42 @@ Issues: {', '.join(exp.get('errors', ['None']))[:80]}
 Match reason: {reason}
 """
         
-        self.memory_text.insert(1.0, memory_display)
+        return memory_display
+    
+    def _render_stats(self):
+        """Value texts for the statistics rows (in _STATS_ROWS order)"""
+        stats = self.system.get_stats()
+        return tuple(fmt(stats) for _, fmt in _STATS_ROWS)
+    
+    def _show_stats(self, values):
+        """Set the statistics labels whose value changed (main thread)"""
+        shown = self._stats_shown
+        for i, value in enumerate(values):
+            if i >= len(shown) or shown[i] != value:
+                self.stats_vars[i].set(value)
+        self._stats_shown = values
     
     def _update_stats(self):
         """Update statistics display"""
-        stats = self.system.get_stats()
-        
-        stats_text = f"""=== SYSTEM STATISTICS ===
-
-📊 CAPTURE STATS:
-  Total Captures: {stats.get('captures', 0)}
-  Gemini API Calls: {stats.get('gemini_calls', 0)}
-  Memory Items: {stats.get('memory_items', 0)}
-
-⏱️ PERFORMANCE:
-  Uptime: {stats.get('uptime', 0):.0f}s
-  Mode: {stats.get('mode', 'MVP')}
-
-💾 MEMORY:
-  File: memory/mvp_memory.json
-  Status: {'Active' if stats.get('memory_items', 0) > 0 else 'Empty'}
-
-🔧 SYSTEM:
-  MVP Mode: {'Yes' if stats.get('mvp_mode', True) else 'No'}
-  Version: 0.1.0
-"""
-        
-        self.stats_text.delete(1.0, tk.END)
-        self.stats_text.insert(1.0, stats_text)
+        self._show_stats(self._render_stats())
+    
+    def _schedule_stats_refresh(self):
+        """Refresh the stats now and every STATS_REFRESH_MS (on the Tk timer)"""
+        self._update_stats()
+        # Pending after() callbacks go away with the window, nothing to cancel
+        self.root.after(STATS_REFRESH_MS, self._schedule_stats_refresh)
     
     def log(self, message):
         """Add message to log"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
+        timestamp = _clock()[1]
+        line = f"[{timestamp}] {message}\n"
+        self.log_text.insert(tk.END, line)
+        self._log_lines += line.count("\n")
+        if self._log_lines > LOG_MAX_LINES + LOG_TRIM_BATCH:
+            # An ever-growing Text widget makes every insert and scroll slower
+            excess = self._log_lines - LOG_MAX_LINES
+            self.log_text.delete("1.0", f"{excess + 1}.0")
+            self._log_lines = LOG_MAX_LINES
         self.log_text.see(tk.END)
         
         # Also print to console for debugging
@@ -381,12 +445,28 @@ Match reason: {reason}
         
         # Load tracker data
         try:
-            with open("mvp_tracker.json", "r") as f:
-                tracker_data = f.read()
-                text.insert(1.0, tracker_data)
+            for chunk in self._read_tracker_file():
+                # Chunk by chunk, redrawing in between, so a big file does not
+                # freeze the popup in one long insert
+                text.insert(tk.END, chunk)
+                popup.update_idletasks()
         except:
             text.insert(1.0, "Could not load tracker file. Check mvp_tracker.json")
     
+    def _read_tracker_file(self):
+        """mvp_tracker.json as text chunks, re-read only when the file changed"""
+        mtime = os.stat("mvp_tracker.json").st_mtime_ns
+        if self._tracker_cache is None or self._tracker_cache[0] != mtime:
+            chunks = []
+            # Incremental decoder: a multi-byte character may straddle two blocks
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            with open("mvp_tracker.json", "rb") as f:
+                while block := f.read(TRACKER_READ_CHUNK):
+                    chunks.append(decoder.decode(block))
+            chunks.append(decoder.decode(b"", final=True))
+            self._tracker_cache = (mtime, chunks)
+        return self._tracker_cache[1]
+    
     def show_help(self):
         """Show help window"""
         help_text = """=== CM VISION MVP HELP ===
@@ -437,8 +517,8 @@ Press F1 to close this help.
     
     def run(self):
         """Start the GUI"""
-        # Initial updates
-        self._update_stats()
+        # Initial updates (stats then keep refreshing on their own)
+        self._schedule_stats_refresh()
         self.log("CM Vision MVP started")
         self.log(f"Capture interval: {self.system.config.capture_interval}s")
         